@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from labelme2yolo import _load_json_without
+from synthetic import write_labelme_file
+
+
+def _json_load(path: str) -> Dict:
+    """
+    Loads a JSON file with json.load (the full parser).
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def _measure(loader: Callable[[str], Dict], path: str, repeat: int) -> Dict[str, float]:
+    """
+    Measures the best parse time and the peak memory allocated by a loader.
+    
+    Args:
+        loader: The function loading the JSON file.
+        path: The path to the JSON file.
+        repeat: The number of timed runs.
+        
+    Returns:
+        Dict: The best time in milliseconds and the peak allocated memory in MB.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(path)
+        best = min(best, time.perf_counter() - start)
+    
+    tracemalloc.start()
+    loader(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time_ms": best * 1000, "peak_mb": peak / (1024 * 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the streaming LabelMe JSON parser with json.load")
+    parser.add_argument("--image-data-mb", type=float, nargs="+", default=[0, 20], help="The sizes of the embedded image data to test.")
+    parser.add_argument("--shapes", type=int, default=20, help="The number of shapes per file.")
+    parser.add_argument("--vertices", type=int, default=50, help="The number of vertices per shape.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of timed runs.")
+    args = parser.parse_args()
+    
+    print(f"{'imageData':>10} {'parser':>8} {'time (ms)':>10} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.image_data_mb:
+            path = os.path.join(tmp_dir, f"sample_{size}.json")
+            # The base64 encoding makes the embedded data 4/3 of the image size
+            image_data = os.urandom(int(size * 3 / 4 * 1024 * 1024)) if size else None
+            write_labelme_file(path, args.shapes, args.vertices, image_data=image_data)
+            for name, loader in (("full", _json_load), ("stream", _load_json_without)):
+                result = _measure(loader, path, args.repeat)
+                print(f"{size:>8}MB {name:>8} {result['time_ms']:>10.2f} {result['peak_mb']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
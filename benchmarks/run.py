@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from labelme2yolo import JsonToYolo, KERNELS, JSON_PARSERS, IMAGE_MODES
+from synthetic import generate_dataset
+
+# The metrics compared with the baseline, higher is better
+COMPARED_METRICS = ("files_per_s", "shapes_per_s")
+
+
+def _run_case(source: str, task: str, options: Dict, results: "multiprocessing.Queue") -> None:
+    """
+    Converts the dataset in a fresh process and sends the measurements back, so that the peak RSS
+    belongs to this conversion only.
+
+    Args:
+        source: The directory of the dataset.
+        task: The conversion task.
+        options: The keyword arguments of the converter.
+        results: The queue receiving the measurements.
+    """
+    target = tempfile.mkdtemp(prefix="labelme2yolo_bench_")
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            converter = JsonToYolo(source, target, task, **options)
+            start = time.perf_counter()
+            stats = converter.process()
+            wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+    # The phase totals are summed over the worker processes and threads
+    phases = {phase: summary["total_s"] for phase, summary in stats["timings"]["phases"].items()}
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    results.put({
+        "files": stats["processed_files"],
+        "shapes": stats["processed_labels"],
+        "wall_s": wall,
+        "files_per_s": stats["processed_files"] / wall if wall > 0 else 0.0,
+        "shapes_per_s": stats["processed_labels"] / wall if wall > 0 else 0.0,
+        "peak_rss_mb": peak_kb / 1024,
+        "phases_s": phases,
+        "file_p99_ms": stats["timings"]["files"].get("p99_ms", 0.0)
+    })
+
+
+def run_case(source: str, task: str, options: Dict) -> Dict:
+    """
+    Runs one conversion of the dataset in a separate process.
+
+    Args:
+        source: The directory of the dataset.
+        task: The conversion task.
+        options: The keyword arguments of the converter.
+
+    Returns:
+        Dict: The measurements of the conversion.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_case, args=(source, task, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def compare_with_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Compares the throughput of each task with a saved baseline.
+
+    Args:
+        results: The measurements of each task.
+        baseline: The baseline measurements of each task.
+        tolerance: The accepted relative slowdown (0.1 accepts 10% less throughput).
+
+    Returns:
+        list: The descriptions of the regressions.
+    """
+    regressions = []
+    for task, result in results.items():
+        if task not in baseline:
+            continue
+        for metric in COMPARED_METRICS:
+            before = baseline[task].get(metric, 0.0)
+            after = result[metric]
+            if before > 0 and after < before * (1 - tolerance):
+                regressions.append(f"{task} {metric}: {after:.1f} < {before:.1f} (-{(1 - after / before) * 100:.1f}%)")
+    return regressions
+
+
+def _print_result(task: str, result: Dict, baseline: Optional[Dict]) -> None:
+    """
+    Prints the measurements of a task.
+
+    Args:
+        task: The conversion task.
+        result: The measurements of the task.
+        baseline: The baseline measurements of the task, if any.
+    """
+    print(f"\n[{task}]")
+    for metric in ("files", "shapes", "wall_s", "files_per_s", "shapes_per_s", "peak_rss_mb", "file_p99_ms"):
+        line = f"  {metric:<14} {result[metric]:>12.2f}"
+        if baseline and metric in baseline:
+            line += f"   (baseline {baseline[metric]:.2f})"
+        print(line)
+    for phase, seconds in result["phases_s"].items():
+        print(f"  phase {phase:<10} {seconds:>8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the throughput of JsonToYolo on a synthetic LabelMe dataset")
+    parser.add_argument("--files", type=int, default=500, help="The number of (image, JSON) pairs.")
+    parser.add_argument("--shapes", type=int, default=10, help="The number of shapes per file.")
+    parser.add_argument("--vertices", type=int, default=50, help="The number of vertices per polygon.")
+    parser.add_argument("--image-data", action="store_true", help="Embed the images as base64 imageData.")
+    parser.add_argument("--width", type=int, default=4000, help="The width of the images.")
+    parser.add_argument("--height", type=int, default=3000, help="The height of the images.")
+    parser.add_argument("--image-bytes", type=int, default=256 * 1024, help="The size of each image file in bytes.")
+    parser.add_argument("--tasks", type=str, nargs="+", default=["detection", "segmentation"],
+                        choices=["detection", "segmentation"], help="The tasks to run.")
+    parser.add_argument("--dataset", type=str, help="Reuse (or create) the dataset in this directory instead of a temporary one.")
+    parser.add_argument("--workers", type=int, default=1, help="The number of worker processes of the converter.")
+    parser.add_argument("--kernel", type=str, choices=KERNELS, default="python", help="The shape normalization kernel.")
+    parser.add_argument("--json-parser", type=str, choices=JSON_PARSERS, default="stream", help="The JSON parser.")
+    parser.add_argument("--image-mode", type=str, choices=IMAGE_MODES, default="copy", help="How the images are placed.")
+    parser.add_argument("--pipeline", action="store_true", help="Run the converter in pipelined mode.")
+    parser.add_argument("--save-baseline", type=str, help="Save the measurements to this JSON file.")
+    parser.add_argument("--baseline", type=str, help="Compare the measurements with this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="The accepted relative slowdown compared with the baseline.")
+    args = parser.parse_args()
+
+    options = {"workers": args.workers, "kernel": args.kernel, "json_parser": args.json_parser,
+               "image_mode": args.image_mode, "pipeline": args.pipeline, "timings": True,
+               "progress": False}
+    dataset = args.dataset or tempfile.mkdtemp(prefix="labelme2yolo_dataset_")
+    try:
+        if not os.path.isdir(dataset) or not os.listdir(dataset):
+            summary = generate_dataset(dataset, args.files, args.shapes, args.vertices, args.image_data,
+                                       args.width, args.height, args.image_bytes)
+            print(f"Generated {summary['files']} files with {summary['shapes']} shapes in {dataset}")
+
+        results = {task: run_case(dataset, task, options) for task in args.tasks}
+    finally:
+        if not args.dataset:
+            shutil.rmtree(dataset, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    for task, result in results.items():
+        _print_result(task, result, baseline.get(task) if baseline else None)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\nSaved baseline: {args.save_baseline}")
+
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regression compared with the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
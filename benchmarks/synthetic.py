@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import math
+import base64
+import random
+import argparse
+from typing import Dict, List, Optional
+
+
+def _random_block(size: int, seed: int) -> bytes:
+    """
+    Creates pseudo random bytes quickly by repeating a random 64 KB block.
+
+    Args:
+        size: The number of bytes.
+        seed: The seed of the random block.
+    """
+    block = random.Random(seed).randbytes(min(size, 1 << 16))
+    return (block * (size // len(block) + 1))[:size] if size else b""
+
+
+def _polygon(rng: random.Random, width: int, height: int, vertices: int) -> List[List[float]]:
+    """
+    Creates a random star-shaped polygon that lies inside the image.
+
+    Args:
+        rng: The random number generator.
+        width: The width of the image.
+        height: The height of the image.
+        vertices: The number of vertices.
+    """
+    radius = rng.uniform(0.02, 0.2) * min(width, height)
+    cx = rng.uniform(radius, width - radius)
+    cy = rng.uniform(radius, height - radius)
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius * rng.uniform(0.5, 1.0)
+        points.append([cx + r * math.cos(angle), cy + r * math.sin(angle)])
+    return points
+
+
+def write_labelme_file(path: str, shapes: int, vertices: int, width: int = 4000, height: int = 3000,
+                       image_path: Optional[str] = None, image_data: Optional[bytes] = None,
+                       labels: Optional[List[str]] = None, seed: int = 0) -> None:
+    """
+    Writes a synthetic LabelMe JSON file.
+
+    Args:
+        path: The path to the JSON file.
+        shapes: The number of shapes.
+        vertices: The number of vertices per polygon.
+        width: The width of the image.
+        height: The height of the image.
+        image_path: The imagePath stored in the file (the name of the JSON file with .tiff by default).
+        image_data: The image bytes embedded as base64 imageData, None for no embedded image.
+        labels: The labels picked for the shapes.
+        seed: The seed of the random shapes.
+    """
+    rng = random.Random(seed)
+    labels = labels or ["label1", "label2", "label3", "label4"]
+    data = {
+        "version": "5.2.1",
+        "flags": {},
+        "shapes": [{"label": rng.choice(labels),
+                    "points": _polygon(rng, width, height, vertices),
+                    "group_id": None,
+                    "shape_type": "polygon",
+                    "flags": {}} for _ in range(shapes)],
+        "imagePath": image_path or os.path.splitext(os.path.basename(path))[0] + ".tiff",
+        "imageData": base64.b64encode(image_data).decode("ascii") if image_data else None,
+        "imageHeight": height,
+        "imageWidth": width
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def generate_dataset(root: str, files: int, shapes: int, vertices: int, image_data: bool = False,
+                     width: int = 4000, height: int = 3000, image_bytes: int = 1 << 20,
+                     files_per_directory: int = 1000, seed: int = 0) -> Dict[str, int]:
+    """
+    Generates a synthetic LabelMe dataset: JSON files and TIFF-named images in subdirectories of root.
+
+    Args:
+        root: The directory of the dataset.
+        files: The number of (image, JSON) pairs.
+        shapes: The number of shapes per file.
+        vertices: The number of vertices per polygon.
+        image_data: Whether the image bytes are embedded in the JSON files.
+        width: The width of the images.
+        height: The height of the images.
+        image_bytes: The size of each image file in bytes.
+        files_per_directory: The number of pairs per subdirectory.
+        seed: The seed of the dataset.
+
+    Returns:
+        Dict: The number of files, shapes and vertices of the dataset.
+    """
+    image = _random_block(image_bytes, seed)
+    for i in range(files):
+        directory = os.path.join(root, f"part_{i // files_per_directory:04d}")
+        os.makedirs(directory, exist_ok=True)
+        stem = f"frame_{i:07d}"
+        with open(os.path.join(directory, f"{stem}.tiff"), "wb") as f:
+            f.write(image)
+        write_labelme_file(os.path.join(directory, f"{stem}.json"), shapes, vertices, width, height,
+                           image_data=image if image_data else None, seed=seed * 1000003 + i)
+    return {"files": files, "shapes": files * shapes, "vertices": files * shapes * vertices}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a synthetic LabelMe dataset")
+    parser.add_argument("--root", type=str, required=True, help="The directory of the dataset.")
+    parser.add_argument("--files", type=int, default=1000, help="The number of (image, JSON) pairs.")
+    parser.add_argument("--shapes", type=int, default=10, help="The number of shapes per file.")
+    parser.add_argument("--vertices", type=int, default=50, help="The number of vertices per polygon.")
+    parser.add_argument("--image-data", action="store_true", help="Embed the images as base64 imageData.")
+    parser.add_argument("--width", type=int, default=4000, help="The width of the images.")
+    parser.add_argument("--height", type=int, default=3000, help="The height of the images.")
+    parser.add_argument("--image-bytes", type=int, default=1 << 20, help="The size of each image file in bytes.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the dataset.")
+    args = parser.parse_args()
+
+    summary = generate_dataset(args.root, args.files, args.shapes, args.vertices, args.image_data,
+                               args.width, args.height, args.image_bytes, seed=args.seed)
+    print(f"Generated {summary['files']} files, {summary['shapes']} shapes and {summary['vertices']} vertices in {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
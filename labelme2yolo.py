@@ -1,437 +1,3478 @@
 import os
-from glob import glob
 import json
 import shutil
 import argparse 
 import sys
+import errno
+import re
+import codecs
 import datetime
+import hashlib
+import math
+import time
+import threading
+import logging
+import heapq
+import io
+import struct
+import tarfile
+import zipfile
+from array import array
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import chain
 from typing import List, Tuple, Dict, Optional, Union
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# The messages are routed through this logger, main() configures it (see _ConsoleHandler)
+logger = logging.getLogger("labelme2yolo")
+logger.addHandler(logging.NullHandler())
+
+# The available shape normalization kernels
+KERNELS = ("python", "numpy")
+
+# The conversion tasks, several of them can be produced in a single run
+TASKS = ("detection", "segmentation")
+
+# The layouts of the target directory: one flat directory, subdirectories of shard_size pairs or tar shards
+OUTPUT_LAYOUTS = ("flat", "sharded", "tar")
+
+# The subdirectory of each task directory holding the image lists of the dataset split (never a label directory)
+SPLITS_DIRECTORY = "splits"
+
+# The statistics kept for each task of a multi-task run
+_TASK_COUNTERS = ("processed_files", "successful_files", "error_files", "processed_labels", "invalid_labels")
+
+# The converter instance owned by a process pool worker (see JsonToYolo._process_parallel)
+_WORKER_CONVERTER: Optional["JsonToYolo"] = None
+
+# Holds the error log of the current pipeline writer thread (see JsonToYolo._write_stage)
+_THREAD_STATE = threading.local()
+
+def _init_worker(converter: "JsonToYolo") -> None:
+    """
+    Initializes a process pool worker with its own copy of the converter.
+    
+    Args:
+        converter: The converter instance to be used by the worker.
+    """
+    global _WORKER_CONVERTER
+    _WORKER_CONVERTER = converter
+    # Errors are collected and handed back to the parent so the log order does not depend on scheduling
+    _WORKER_CONVERTER.error_log = ErrorLog(None)
+    if _WORKER_CONVERTER.timings is not None:
+        _WORKER_CONVERTER.timings = PhaseTimings()
+        _WORKER_CONVERTER._install_timings()
+
+def _convert_pair_in_worker(pair: Tuple[str, str]) -> Tuple[Dict[str, int], List[tuple], Optional[str], Optional[tuple],
+                                                           Optional[Tuple[str, Dict]]]:
+    """
+    Converts a single (tiff, json) pair inside a process pool worker.
+    
+    Args:
+        pair: A tuple containing the path to a TIFF file and its corresponding JSON file.
+        
+    Returns:
+        tuple: The statistics of the pair, the error records produced while converting it, the path of the
+            copied source image (None if the conversion failed), the recorded timings (None if disabled) and
+            the sample record of the split (None if the dataset is not split).
+    """
+    converter = _WORKER_CONVERTER
+    stats = converter._empty_stats(converter.tasks)
+    image_file = converter._convert_file(pair[1], stats)
+    timings = converter.timings.drain() if converter.timings is not None else None
+    return stats, converter.error_log.drain(), image_file, timings, converter._samples.pop(pair[1], None)
+
+def _merge_stats(stats: Dict, file_stats: Dict) -> None:
+    """
+    Adds the statistics of a file to the overall statistics, including the statistics of each task.
+    
+    Args:
+        stats: The statistics dictionary to be updated.
+        file_stats: The statistics of the file.
+    """
+    for key, value in file_stats.items():
+        if isinstance(value, dict):
+            _merge_stats(stats[key], value)
+        else:
+            stats[key] += value
+
+def _hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-1 hash of a file's content.
+    
+    Args:
+        path: The path to the file.
+        chunk_size: The number of bytes read at a time.
+        
+    Returns:
+        str: The hexadecimal digest of the file.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _copy_file_hashed(src: str, dst: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Copies a file (content and permission bits) and computes the SHA-1 hash of its content in the same pass.
+    
+    Args:
+        src: The path to the source file.
+        dst: The path to the destination file.
+        chunk_size: The number of bytes read at a time.
+        
+    Returns:
+        str: The hexadecimal digest of the file.
+    """
+    # A link left by a previous run would let the copy truncate the source
+    if os.path.lexists(dst):
+        os.remove(dst)
+    digest = hashlib.sha1()
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        for chunk in iter(lambda: fsrc.read(chunk_size), b""):
+            digest.update(chunk)
+            fdst.write(chunk)
+    shutil.copymode(src, dst)
+    return digest.hexdigest()
+
+def _normalize_bbox(points: list, image_width: float, image_height: float) -> Tuple[float, float, float, float]:
+    """
+    Computes the normalized bounding box of the points of a shape.
+    
+    Args:
+        points: The points of the shape.
+        image_width: The width of the image.
+        image_height: The height of the image.
+        
+    Returns:
+        tuple: The normalized x center, y center, width and height.
+    """
+    x_coords = [point[0] for point in points]
+    y_coords = [point[1] for point in points]
+    
+    x_center = sum(x_coords) / len(x_coords)
+    y_center = sum(y_coords) / len(y_coords)
+    
+    x_center /= image_width
+    y_center /= image_height
+    width = (max(x_coords) - min(x_coords)) / image_width
+    height = (max(y_coords) - min(y_coords)) / image_height
+    return x_center, y_center, width, height
+
+def _polygon_values(points: list, image_width: float,
+                    image_height: float) -> Tuple[Optional[List[float]], Optional[Tuple[float, float]]]:
+    """
+    Normalizes the points of a polygon.
+    
+    Args:
+        points: The points of the polygon.
+        image_width: The width of the image.
+        image_height: The height of the image.
+        
+    Returns:
+        tuple: The flat list of normalized coordinates and None, or None and the first normalized point
+            out of the image.
+    """
+    values = []
+    for point in points:
+        x_normalized = point[0] / image_width
+        y_normalized = point[1] / image_height
+        
+        # Check if the normalized coordinates are valid
+        if not (0 <= x_normalized <= 1 and 0 <= y_normalized <= 1):
+            return None, (x_normalized, y_normalized)
+            
+        values.append(x_normalized)
+        values.append(y_normalized)
+    return values, None
+
+def _normalize_polygon(points: list, image_width: float,
+                       image_height: float) -> Tuple[Optional[str], Optional[Tuple[float, float]]]:
+    """
+    Normalizes the points of a polygon and formats them as YOLO coordinates.
+    
+    Args:
+        points: The points of the polygon.
+        image_width: The width of the image.
+        image_height: The height of the image.
+        
+    Returns:
+        tuple: The formatted coordinates and None, or None and the first normalized point out of the image.
+    """
+    values, invalid_point = _polygon_values(points, image_width, image_height)
+    if values is None:
+        return None, invalid_point
+    return ' '.join(f"{value:.6f}" for value in values), None
+
+def _stack_points(shapes_points: List[Optional[list]]) -> Tuple["np.ndarray", List[int], List[int]]:
+    """
+    Stacks the points of several shapes into one (N, 2) array.
+    
+    Args:
+        shapes_points: The points of each shape, None for the shapes to be left out.
+        
+    Returns:
+        tuple: The coordinates, the start offset of each stacked shape and the indices of the stacked shapes.
+        
+    Raises:
+        ValueError: If the points are not numeric (x, y) pairs.
+    """
+    indices = [i for i, points in enumerate(shapes_points) if points]
+    starts = []
+    offset = 0
+    for i in indices:
+        starts.append(offset)
+        offset += len(shapes_points[i])
+    
+    coords = np.array(list(chain.from_iterable(shapes_points[i] for i in indices)))
+    if coords.ndim != 2 or coords.shape[1] != 2 or coords.dtype.kind not in "iuf":
+        raise ValueError("Points are not numeric (x, y) pairs")
+    return coords.astype(np.float64, copy=False), starts, indices
+
+def _format_unit_values(values: "np.ndarray") -> "np.ndarray":
+    """
+    Formats values in the [0, 1] range like "%.6f " without going through the interpreter.
+    
+    The values are rounded to 6 digits in fixed point and the digits are written into a byte array. A
+    product that falls too close to a rounding tie, where the float error could change the result, is
+    formatted with "%.6f" instead, so the output is identical to the string formatting.
+    
+    Args:
+        values: The flat array of values, all in the [0, 1] range.
+        
+    Returns:
+        np.ndarray: A (N, 9) uint8 array holding the formatted value followed by a space on each row.
+    """
+    scaled = values * 1e6
+    fixed = np.rint(scaled).astype(np.int64)
+    chars = np.empty((len(values), 9), dtype=np.uint8)
+    chars[:, 0] = 48 + fixed // 1000000
+    chars[:, 1] = ord(".")
+    for j in range(6):
+        chars[:, 2 + j] = 48 + (fixed // 10 ** (5 - j)) % 10
+    chars[:, 8] = ord(" ")
+    
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ambiguous.tolist():
+        chars[i] = np.frombuffer(("%.6f " % values[i]).encode("ascii"), dtype=np.uint8)
+    return chars
+
+def _numpy_polygons(shapes_points: List[Optional[list]], image_width: float,
+                    image_height: float) -> List[Optional[Tuple[Optional[str], Optional[Tuple[float, float]]]]]:
+    """
+    Vectorized version of _normalize_polygon for all the shapes of a file. The points are normalized
+    and range-checked in bulk, and each polygon is formatted with a single format operation.
+    
+    Args:
+        shapes_points: The points of each shape, None for the shapes to be left out.
+        image_width: The width of the image.
+        image_height: The height of the image.
+        
+    Returns:
+        list: The result of _normalize_polygon for each shape (None for the shapes left out).
+    """
+    results: List[Optional[Tuple[Optional[str], Optional[Tuple[float, float]]]]] = [None] * len(shapes_points)
+    if not any(shapes_points):
+        return results
+    
+    coords, starts, indices = _stack_points(shapes_points)
+    normalized = coords / (image_width, image_height)
+    point_valid = ((normalized >= 0) & (normalized <= 1)).all(axis=1)
+    shape_valid = np.logical_and.reduceat(point_valid, starts).tolist()
+    flat = normalized.ravel()
+    ends = starts[1:] + [len(coords)]
+    
+    # The values of the invalid shapes are not used, they are only kept in range for the formatting
+    text = _format_unit_values(np.where((flat >= 0) & (flat <= 1), flat, 0.0)).tobytes()
+    # -0.0 is formatted as "-0.000000", which does not fit the fixed width rows
+    signed = np.logical_or.reduceat(np.signbit(normalized).any(axis=1), starts).tolist()
+    
+    for k, i in enumerate(indices):
+        start, end = starts[k], ends[k]
+        if shape_valid[k] and not signed[k]:
+            results[i] = (text[18 * start:18 * end - 1].decode("ascii"), None)
+        elif shape_valid[k]:
+            shape_values = flat[2 * start:2 * end].tolist()
+            results[i] = (("%.6f " * len(shape_values))[:-1] % tuple(shape_values), None)
+        else:
+            invalid = start + int(np.argmin(point_valid[start:end]))
+            results[i] = (None, tuple(normalized[invalid].tolist()))
+    return results
+
+# The number of points of a segment above which _simplify_polygon computes the distances with NumPy
+_VECTORIZED_SEGMENT = 64
+
+def _farthest_from_segment(xs: list, ys: list, start: int, end: int) -> Tuple[int, float]:
+    """
+    Finds the point between two vertices of a polyline that is the farthest from the segment joining them.
+    
+    Args:
+        xs: The x coordinates of the polyline.
+        ys: The y coordinates of the polyline.
+        start: The index of the first vertex of the segment.
+        end: The index of the last vertex of the segment.
+        
+    Returns:
+        tuple: The index of the farthest point and its distance to the segment.
+    """
+    ax, ay = xs[start], ys[start]
+    dx, dy = xs[end] - ax, ys[end] - ay
+    length = dx * dx + dy * dy
+    farthest, max_distance = start + 1, -1.0
+    for i in range(start + 1, end):
+        px, py = xs[i] - ax, ys[i] - ay
+        t = min(1.0, max(0.0, (px * dx + py * dy) / length)) if length else 0.0
+        distance = math.hypot(px - t * dx, py - t * dy)
+        if distance > max_distance:
+            farthest, max_distance = i, distance
+    return farthest, max_distance
+
+def _numpy_farthest_from_segment(coords: "np.ndarray", start: int, end: int) -> Tuple[int, float]:
+    """
+    Vectorized version of _farthest_from_segment.
+    
+    Args:
+        coords: The (n, 2) coordinates of the polyline.
+        start: The index of the first vertex of the segment.
+        end: The index of the last vertex of the segment.
+        
+    Returns:
+        tuple: The index of the farthest point and its distance to the segment.
+    """
+    a = coords[start]
+    ab = coords[end] - a
+    ap = coords[start + 1:end] - a
+    length = float(ab @ ab)
+    t = np.clip(ap @ ab / length, 0.0, 1.0) if length else np.zeros(len(ap))
+    distances = np.hypot(*(ap - t[:, None] * ab).T)
+    k = int(np.argmax(distances))
+    return start + 1 + k, float(distances[k])
+
+def _simplify_polygon(points: list, tolerance: float, max_vertices: int = 0,
+                      vectorized: bool = False) -> Tuple[List[int], float]:
+    """
+    Simplifies a closed polygon with the Douglas-Peucker algorithm. The polygon is split at its first
+    vertex and the vertex farthest from it, then the vertex farthest from the simplified polygon is added
+    (largest deviation first) until every dropped vertex is within the tolerance of the simplified
+    polygon or the polygon has max_vertices vertices. At least 3 vertices are kept.
+    
+    Args:
+        points: The points of the polygon, in pixels.
+        tolerance: The largest accepted distance of a dropped vertex to the simplified polygon, in pixels.
+        max_vertices: The largest number of vertices of the simplified polygon, 0 for no limit.
+        vectorized: Whether the distances of the long segments are computed with NumPy.
+        
+    Returns:
+        tuple: The indices of the kept points, in order, and the largest distance of a dropped point to
+            the simplified polygon (the geometric error, in pixels).
+    """
+    n = len(points)
+    limit = max(3, max_vertices) if max_vertices > 0 else n
+    if n <= 3 or (n <= limit and tolerance <= 0):
+        return list(range(n)), 0.0
+    
+    # The first point is repeated at the end to close the polygon
+    xs = [float(point[0]) for point in points]
+    ys = [float(point[1]) for point in points]
+    if not all(map(math.isfinite, chain(xs, ys))):
+        raise ValueError("The polygon has non-finite coordinates")
+    xs.append(xs[0])
+    ys.append(ys[0])
+    first = max(range(1, n), key=lambda i: math.hypot(xs[i] - xs[0], ys[i] - ys[0]))
+    # NumPy only pays off on the long segments of the first splits
+    coords = np.column_stack([xs, ys]) if vectorized else None
+    
+    # The segments of the simplified polygon, the one with the largest deviation first
+    segments = []
+    
+    def split(start: int, end: int) -> None:
+        if end - start < 2:
+            return
+        if coords is not None and end - start > _VECTORIZED_SEGMENT:
+            index, distance = _numpy_farthest_from_segment(coords, start, end)
+        else:
+            index, distance = _farthest_from_segment(xs, ys, start, end)
+        heapq.heappush(segments, (-distance, start, end, index))
+    
+    kept = [0, first]
+    split(0, first)
+    split(first, n)
+    while segments and len(kept) < limit:
+        distance, start, end, index = segments[0]
+        if -distance <= tolerance and len(kept) >= 3:
+            break
+        heapq.heappop(segments)
+        kept.append(index)
+        split(start, index)
+        split(index, end)
+    
+    kept.sort()
+    return kept, -segments[0][0] if segments else 0.0
+
+def _scan_directory(directory: str, image_extensions: Tuple[str, ...]
+                    ) -> Tuple[List[str], List[str], List[Tuple[str, Tuple[int, int]]], List[Tuple[str, str]]]:
+    """
+    Lists the JSON and image files and the subdirectories of one directory with os.scandir. Symlinked
+    directories are listed like the other subdirectories.
+    
+    Args:
+        directory: The directory to list.
+        image_extensions: The lowercase image file extensions.
+        
+    Returns:
+        tuple: The JSON files, the image files, the (path, (st_dev, st_ino)) pairs of the subdirectories and
+            the (path, error) pairs of the entries that could not be read.
+    """
+    json_files: List[str] = []
+    image_files: List[str] = []
+    subdirectories: List[Tuple[str, Tuple[int, int]]] = []
+    errors: List[Tuple[str, str]] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    try:
+                        info = entry.stat()
+                    except OSError as e:
+                        errors.append((entry.path, str(e)))
+                        continue
+                    subdirectories.append((entry.path, (info.st_dev, info.st_ino)))
+                    continue
+                
+                extension = os.path.splitext(entry.name)[1].lower()
+                if extension == ".json":
+                    json_files.append(entry.path)
+                elif extension in image_extensions:
+                    image_files.append(entry.path)
+    except OSError as e:
+        errors.append((directory, str(e)))
+    
+    return json_files, image_files, subdirectories, errors
+
+def _scan_source_directory(path: str, image_extensions: Tuple[str, ...], exclude: str,
+                           workers: int = 1) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+    """
+    Collects the JSON and image files below the source directory. Symlinked directories are followed,
+    and a directory reached twice (through a link or a link loop) is scanned once. With several workers,
+    every subdirectory found at any depth is listed by the thread pool, which hides the latency of
+    network filesystems.
+    
+    Args:
+        path: The source directory.
+        image_extensions: The lowercase image file extensions.
+        exclude: A directory that is not scanned (e.g. the output directory).
+        workers: The number of scanning threads.
+        
+    Returns:
+        tuple: The JSON files, the image files and the (path, error) pairs of the entries that could not be read.
+    """
+    json_files: List[str] = []
+    image_files: List[str] = []
+    errors: List[Tuple[str, str]] = []
+    
+    try:
+        info = os.stat(path)
+    except OSError as e:
+        return json_files, image_files, [(path, str(e))]
+    visited = {(info.st_dev, info.st_ino)}
+    try:
+        info = os.stat(exclude)
+        excluded = (info.st_dev, info.st_ino)
+    except OSError:
+        excluded = None
+    
+    def collect(result) -> List[str]:
+        # Merges the listing of a directory and returns its subdirectories that are still to be scanned
+        sub_json, sub_images, subdirectories, sub_errors = result
+        json_files.extend(sub_json)
+        image_files.extend(sub_images)
+        errors.extend(sub_errors)
+        pending = []
+        for subdirectory, key in subdirectories:
+            if key == excluded:
+                continue
+            if key in visited:
+                logger.debug("Directory already scanned, skipped: %s", subdirectory)
+                continue
+            visited.add(key)
+            pending.append(subdirectory)
+        return pending
+    
+    if workers <= 1:
+        stack = [path]
+        while stack:
+            stack.extend(collect(_scan_directory(stack.pop(), image_extensions)))
+        return json_files, image_files, errors
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_scan_directory, path, image_extensions)}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                for subdirectory in collect(future.result()):
+                    futures.add(executor.submit(_scan_directory, subdirectory, image_extensions))
+    
+    return json_files, image_files, errors
+
+# Matches the JSON whitespace that can separate tokens
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# The available JSON parsers
+JSON_PARSERS = ("stream", "full")
+
+class _JsonStream:
+    """
+    A buffer over a JSON file that is read in chunks. Only the data that has not been consumed yet is
+    kept in memory, so a value can be skipped without holding all of it.
+    """
+    def __init__(self, file, chunk_size: int):
+        """
+        The constructor of the _JsonStream Class.
+        
+        Args:
+            file: The JSON file opened in binary mode.
+            chunk_size: The number of bytes read at a time.
+        """
+        self.file = file
+        # A small file is read at once without allocating a full chunk
+        self.chunk_size = max(1, min(chunk_size, os.fstat(file.fileno()).st_size + 1))
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+
+    def fill(self, size: Optional[int] = None) -> bool:
+        """
+        Drops the consumed data and appends the next chunk of the file to the buffer.
+        
+        Args:
+            size: The number of bytes to read (one chunk by default).
+            
+        Returns:
+            bool: False if the end of the file had already been reached.
+        """
+        if self.eof:
+            return False
+        data = self.file.read(size or self.chunk_size)
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self._text_decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips the whitespace and returns the next character ('' at the end of the file).
+        """
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """
+        Consumes the next character, which must be one of the given characters.
+        
+        Args:
+            chars: The accepted characters.
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expecting one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def decode_value(self):
+        """
+        Decodes the next JSON value, reading more of the file until the value is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                # Grow the buffer geometrically so that a long value is decoded in a few attempts
+                self.fill(max(self.chunk_size, 3 * (len(self.buffer) - self.pos)))
+                continue
+            
+            # A number cut by the end of the buffer (e.g. "12" of "12.5") may continue in the next chunk
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] in "0123456789.eE+-"):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def skip_string(self) -> None:
+        """
+        Skips the next JSON string without decoding it.
+        """
+        self.pos += 1
+        while True:
+            quote = self.buffer.find('"', self.pos)
+            backslash = self.buffer.find('\\', self.pos, quote if quote >= 0 else len(self.buffer))
+            if backslash >= 0 and backslash + 1 < len(self.buffer):
+                self.pos = backslash + 2
+                continue
+            if backslash >= 0:
+                # The escaped character is in the next chunk
+                self.pos = backslash
+            elif quote >= 0:
+                self.pos = quote + 1
+                return
+            else:
+                self.pos = len(self.buffer)
+            
+            if not self.fill():
+                raise ValueError("Unterminated string")
+
+def _load_json_without(path: str, skip_key: str = "imageData", chunk_size: int = 4 << 20) -> Dict:
+    """
+    Loads a JSON object while dropping the string value of one of its top-level keys (e.g. the base64
+    image data of a LabelMe file). The file is read in chunks, the other values are decoded with json
+    and the dropped value is never decoded nor held in memory as a whole, its key is kept with a null value.
+    
+    Documents that cannot be read this way are loaded with json.load, which also reports the same
+    errors as before for malformed files.
+    
+    Args:
+        path: The path to the JSON file.
+        skip_key: The top-level key whose string value is dropped.
+        chunk_size: The number of bytes read at a time.
+        
+    Returns:
+        Dict: The parsed JSON document.
+    """
+    try:
+        with open(path, "rb") as f:
+            stream = _JsonStream(f, chunk_size)
+            stream.expect("{")
+            result = {}
+            
+            if stream.peek() == "}":
+                stream.pos += 1
+            else:
+                while True:
+                    if stream.peek() != '"':
+                        raise ValueError("Expecting property name")
+                    key = stream.decode_value()
+                    stream.expect(":")
+                    
+                    if key == skip_key and stream.peek() == '"':
+                        stream.skip_string()
+                        result[key] = None
+                    else:
+                        result[key] = stream.decode_value()
+                    
+                    if stream.expect(",}") == "}":
+                        break
+            
+            if stream.peek():
+                raise ValueError("Extra data")
+            return result
+    except ValueError:
+        with open(path) as f:
+            return json.load(f)
+
+# The ioctl request that clones a file's extents on copy-on-write filesystems (Linux FICLONE)
+_FICLONE = 0x40049409
+
+# The supported ways of materializing the images in the target directory
+IMAGE_MODES = ("copy", "hardlink", "symlink", "reflink", "none")
+
+def load_label_mapping(path: str) -> Union[Dict, List]:
+    """
+    Loads a label mapping specification from a JSON or YAML file (see _compile_label_mapping).
+    
+    Args:
+        path: The path to the .json, .yaml or .yml file.
+        
+    Returns:
+        The specification.
+    """
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError("Reading a YAML label mapping requires PyYAML to be installed")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def _compile_label_mapping(spec: Union[Dict, List]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Compiles a label mapping specification into the forward (label to class id) and inverse (class id to
+    class name) lookup tables. The specification is one of:
+    
+    - a list of class names, the class id being the position in the list;
+    - a dictionary with the class names under "classes" or "names" (a list, or a dictionary of class id
+      to name as in a YOLO data.yaml) and optional "aliases" mapping other labels to a class name or id;
+    - a dictionary of label to class id, the labels sharing a class id are merged into the first one.
+    
+    Args:
+        spec: The specification.
+        
+    Returns:
+        tuple: The class id of each label (including the aliases) and the name of each class id.
+        
+    Raises:
+        ValueError: If the specification is invalid.
+    """
+    aliases = {}
+    if isinstance(spec, dict) and ("classes" in spec or "names" in spec):
+        names = spec.get("classes", spec.get("names"))
+        if isinstance(names, dict):
+            if not all(isinstance(key, (int, str)) and not isinstance(key, bool) and str(key).isdigit() for key in names):
+                raise ValueError(f"Invalid class ids in the names: {list(names)}")
+            class_ids = sorted(int(key) for key in names)
+            if class_ids != list(range(len(names))):
+                raise ValueError(f"The class ids must be contiguous from 0: {class_ids}")
+            names = [names[key] for key in sorted(names, key=int)]
+        aliases = spec.get("aliases") or {}
+    elif isinstance(spec, dict):
+        names = {}
+        for label, class_id in spec.items():
+            # bool is a subclass of int, True and False are not class ids
+            if not isinstance(class_id, int) or isinstance(class_id, bool) or class_id < 0:
+                raise ValueError(f"Invalid class id for label {label}: {class_id}")
+            if class_id in names:
+                aliases[label] = class_id
+            else:
+                names[class_id] = label
+        if sorted(names) != list(range(len(names))):
+            raise ValueError(f"The class ids must be contiguous from 0: {sorted(names)}")
+        names = [names[class_id] for class_id in range(len(names))]
+    else:
+        names = spec
+    
+    if not isinstance(names, list) or not all(isinstance(name, str) and name for name in names):
+        raise ValueError("The class names must be a list of non-empty strings")
+    if len(set(names)) != len(names):
+        raise ValueError("The class names must be unique")
+    if not isinstance(aliases, dict):
+        raise ValueError("The aliases must be a mapping of label to class name or id")
+    
+    forward = {name: class_id for class_id, name in enumerate(names)}
+    for alias, target in aliases.items():
+        class_id = target if isinstance(target, int) and not isinstance(target, bool) else forward.get(target)
+        if class_id is None or not 0 <= class_id < len(names):
+            raise ValueError(f"Alias {alias} refers to an unknown class: {target}")
+        if alias in forward and forward[alias] != class_id:
+            raise ValueError(f"Alias {alias} conflicts with a class name")
+        forward[alias] = class_id
+    return forward, names
+
+def _scan_labels(json_file: str) -> Dict[str, int]:
+    """
+    Counts the labels of the shapes of a JSON file (used by the label pre-scan).
+    
+    Args:
+        json_file: The path to the JSON file.
+        
+    Returns:
+        Dict: The number of shapes of each label, empty if the file cannot be read (the conversion reports it).
+    """
+    try:
+        data = _load_json_without(json_file, "imageData")
+    except Exception:
+        return {}
+    
+    counts: Dict[str, int] = {}
+    for shape in data.get("shapes", []) if isinstance(data, dict) else []:
+        label = shape.get("label") if isinstance(shape, dict) else None
+        if label and isinstance(label, str):
+            counts[label] = counts.get(label, 0) + 1
+    return counts
+
+# The class id token of a YOLO label line
+_CLASS_ID = re.compile(r"[0-9]+")
+
+def classify_label(label: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Checks if a YOLO label line belongs to the bounding box or polygon format. The conversion builds
+    valid labels by construction, this validates existing label files (see verify_labels).
+    
+    Args:
+        label: The label line in YOLO format.
+        
+    Returns:
+        tuple: "Detection (BBox)" or "Segmentation (Polygon)" and None, None for a valid label,
+            None and the error code and message for an invalid one.
+    """
+    # Check if the label is empty or invalid
+    if not label or not label.strip():
+        return None, "empty_label", "Empty label"
+    
+    try:
+        tokens = label.split()
+        data = list(map(float, tokens))
+        
+        # At least one class ID is required
+        if len(data) < 2:
+            return None, "insufficient_data", "Insufficient data: At least one class ID and one coordinate is required"
+        
+        # The first value is the class ID, written as a non-negative integer
+        if not _CLASS_ID.fullmatch(tokens[0]):
+            return None, "invalid_class_id", f"Class id is not a non-negative integer: {tokens[0]}"
+        values = data[1:]
+        
+        # The YOLO bbox label format is checked: exactly 4 values (x, y, w, h), all of them normalized
+        if len(values) == 4:
+            if all(0 <= val <= 1 for val in values):
+                return "Detection (BBox)", None, None
+            return None, "out_of_range", "Bbox coordinates are out of range"
+        
+        # Check if the coordinates are in YOLO polygon format : at least 6 values (3 points) and an even number of them
+        elif len(values) >= 6 and len(values) % 2 == 0:
+            invalid_coords = [f"({values[i]},{values[i + 1]})" for i in range(0, len(values), 2)
+                              if not (0 <= values[i] <= 1 and 0 <= values[i + 1] <= 1)]
+            if invalid_coords:
+                return None, "out_of_range", f"Invalid polygon coordinates: {', '.join(invalid_coords)}"
+            return "Segmentation (Polygon)", None, None
+        
+        else:
+            return None, "unsupported_format", f"Unsupported coordinate number: {len(values)}"
+        
+    except Exception as e:
+        return None, "validation_error", f"Process Error: {str(e)}"
+
+def _verify_label_file(path: str, num_classes: Optional[int] = None) -> Tuple[Dict[str, int], List[Tuple[int, str, str]]]:
+    """
+    Validates all the lines of a YOLO label file.
+    
+    Args:
+        path: The path to the label file.
+        num_classes: The number of classes (the class ids must be below it), None to skip the check.
+        
+    Returns:
+        tuple: The number of lines, bounding boxes, polygons and invalid lines, and the line index,
+            error code and message of each invalid line.
+    """
+    counts = {"lines": 0, "bboxes": 0, "polygons": 0, "invalid_lines": 0}
+    errors: List[Tuple[int, str, str]] = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError) as e:
+        counts["invalid_lines"] += 1
+        return counts, [(0, "read_error", f"File could not be read: {str(e)}")]
+    
+    for line_index, line in enumerate(lines):
+        counts["lines"] += 1
+        kind, code, message = classify_label(line)
+        if kind is not None and num_classes is not None and not int(line.split(maxsplit=1)[0]) < num_classes:
+            kind, code, message = None, "unknown_class", f"Class id out of range: {line.split(maxsplit=1)[0]}"
+        if kind is None:
+            counts["invalid_lines"] += 1
+            errors.append((line_index, code, message))
+        elif kind == "Detection (BBox)":
+            counts["bboxes"] += 1
+        else:
+            counts["polygons"] += 1
+    return counts, errors
+
+def verify_labels(directory: str, workers: int = 1) -> Dict[str, int]:
+    """
+    Validates all the YOLO label files below a directory (at any depth, e.g. a task directory in the
+    flat or sharded layout) with a pool of processes. The class ids are checked against classes.txt
+    if the directory has one, and the invalid lines are written to label_verify_errors.txt.
+    
+    Args:
+        directory: The directory of the label files.
+        workers: The number of worker processes.
+        
+    Returns:
+        Dict: The number of files, invalid files, lines, bounding boxes, polygons and invalid lines.
+    """
+    classes_file = os.path.join(directory, "classes.txt")
+    num_classes = None
+    if os.path.isfile(classes_file):
+        with open(classes_file, encoding="utf-8") as f:
+            num_classes = sum(1 for line in f if line.strip())
+    
+    label_files = []
+    for root, directories, names in os.walk(directory):
+        # The image lists of the dataset split are not label files
+        if SPLITS_DIRECTORY in directories:
+            directories.remove(SPLITS_DIRECTORY)
+        label_files.extend(os.path.join(root, name) for name in names
+                           if name.endswith(".txt") and name not in ("classes.txt", "label_verify_errors.txt"))
+    label_files.sort()
+    stats = {"files": 0, "invalid_files": 0, "lines": 0, "bboxes": 0, "polygons": 0, "invalid_lines": 0}
+    error_log = ErrorLog(os.path.join(directory, "label_verify_errors.txt"))
+    
+    def collect(results) -> None:
+        for path, (counts, errors) in zip(label_files, results):
+            stats["files"] += 1
+            stats["invalid_files"] += 1 if errors else 0
+            for key, value in counts.items():
+                stats[key] += value
+            for line_index, code, message in errors:
+                error_log.write(path, f"Line {line_index + 1}: {message}", code, line_index)
+    
+    try:
+        if workers > 1 and len(label_files) > 1:
+            chunksize = max(1, len(label_files) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                collect(executor.map(_verify_label_file, label_files, [num_classes] * len(label_files),
+                                     chunksize=chunksize))
+        else:
+            collect(_verify_label_file(path, num_classes) for path in label_files)
+    finally:
+        error_log.close()
+    
+    stats["errors_path"] = error_log.path
+    return stats
+
+def _reflink_file(src: str, dst: str) -> int:
+    """
+    Clones a file without duplicating its data. FICLONE is tried first, then copy_file_range which lets
+    the kernel (or an NFS/SMB server) copy or share the extents without going through user space.
+    
+    Args:
+        src: The path to the source file.
+        dst: The path to the destination file.
+        
+    Returns:
+        int: The number of bytes that may have been physically copied (0 for a real clone).
+        
+    Raises:
+        OSError: If neither method is supported for these files.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            import fcntl
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return 0
+        except (ImportError, OSError):
+            pass
+        
+        if not hasattr(os, "copy_file_range"):
+            raise OSError(errno.EOPNOTSUPP, "Reflink is not supported on this platform", src)
+        
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+        while copied < size:
+            sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if sent == 0:
+                break
+            copied += sent
+        return copied
+
+# The converter methods timed for each phase when the timings are enabled (see JsonToYolo._install_timings),
+# convert includes normalize
+_TIMED_PHASES = {
+    "pairing": ("_read_tiff_and_json_files",),
+    "parse": ("_load_json",),
+    "convert": ("_build_shape_labels", "_build_tasks_labels"),
+    "normalize": ("_normalize_shapes",),
+    "simplify": ("_simplify_shapes",),
+    "write": ("_write_label_file",),
+    "image_copy": ("_materialize_image",),
+    "split": ("_split_dataset",)
+}
+
+# The converter methods that convert a whole file
+_TIMED_FILE_METHODS = ("_convert_file",)
+
+class PhaseTimings:
+    """
+    Collects the durations of the conversion phases and of each converted file, and summarizes them
+    with totals, percentiles and the slowest files.
+    """
+    def __init__(self, slowest: int = 10):
+        """
+        The constructor of the PhaseTimings Class.
+        
+        Args:
+            slowest: The number of slowest files that are reported.
+        """
+        self.slowest = slowest
+        self.samples: Dict[str, array] = {phase: array("d") for phase in _TIMED_PHASES}
+        self.file_samples = array("d")
+        self.slowest_files: List[Tuple[float, str]] = []
+
+    def add(self, phase: str, seconds: float) -> None:
+        """
+        Records the duration of one call of a phase.
+        
+        Args:
+            phase: The name of the phase.
+            seconds: The duration.
+        """
+        self.samples[phase].append(seconds)
+
+    def add_file(self, json_file: str, seconds: float) -> None:
+        """
+        Records the duration of the conversion of a file.
+        
+        Args:
+            json_file: The path to the JSON file.
+            seconds: The duration.
+        """
+        self.file_samples.append(seconds)
+        if len(self.slowest_files) < self.slowest:
+            heapq.heappush(self.slowest_files, (seconds, json_file))
+        elif seconds > self.slowest_files[0][0]:
+            heapq.heapreplace(self.slowest_files, (seconds, json_file))
+
+    def drain(self) -> Tuple[Dict[str, array], array, List[Tuple[float, str]]]:
+        """
+        Removes and returns the recorded durations (used to send them from a pool worker to the parent).
+        """
+        state = (self.samples, self.file_samples, self.slowest_files)
+        self.samples = {phase: array("d") for phase in _TIMED_PHASES}
+        self.file_samples = array("d")
+        self.slowest_files = []
+        return state
+
+    def merge(self, state: Tuple[Dict[str, array], array, List[Tuple[float, str]]]) -> None:
+        """
+        Adds the durations recorded by another instance.
+        
+        Args:
+            state: The durations returned by drain().
+        """
+        samples, file_samples, slowest_files = state
+        for phase, values in samples.items():
+            self.samples[phase].extend(values)
+        self.file_samples.extend(file_samples)
+        for seconds, json_file in slowest_files:
+            if len(self.slowest_files) < self.slowest:
+                heapq.heappush(self.slowest_files, (seconds, json_file))
+            elif seconds > self.slowest_files[0][0]:
+                heapq.heapreplace(self.slowest_files, (seconds, json_file))
+
+    @staticmethod
+    def _summarize(values: array) -> Dict[str, float]:
+        """
+        Summarizes durations with their count, total, mean and percentiles (in milliseconds).
+        
+        Args:
+            values: The durations in seconds.
+        """
+        if not values:
+            return {"count": 0, "total_s": 0.0}
+        ordered = sorted(values)
+        count = len(ordered)
+        
+        def percentile(p: float) -> float:
+            return ordered[min(count - 1, int(p * count))] * 1000
+        
+        return {
+            "count": count,
+            "total_s": sum(ordered),
+            "mean_ms": sum(ordered) / count * 1000,
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "max_ms": ordered[-1] * 1000
+        }
+
+    def summary(self) -> Dict:
+        """
+        Summarizes the recorded durations.
+        
+        Returns:
+            Dict: The summary of each phase, of the files and the slowest files.
+        """
+        return {
+            "phases": {phase: self._summarize(values) for phase, values in self.samples.items()},
+            "files": self._summarize(self.file_samples),
+            "slowest_files": [{"file": json_file, "seconds": seconds}
+                              for seconds, json_file in sorted(self.slowest_files, reverse=True)]
+        }
+
+def _profile_summary(profiler, limit: int = 20) -> List[Dict[str, Union[str, int, float]]]:
+    """
+    Lists the functions with the highest cumulative time of a cProfile run.
+    
+    Args:
+        profiler: The cProfile.Profile instance.
+        limit: The number of functions listed.
+        
+    Returns:
+        list: The function, number of calls, own time and cumulative time of the listed functions.
+    """
+    import pstats
+    
+    entries = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in pstats.Stats(profiler).stats.items():
+        entries.append({"function": f"{os.path.basename(filename)}:{line}({function})", "calls": calls,
+                        "total_s": total, "cumulative_s": cumulative})
+    entries.sort(key=lambda entry: entry["cumulative_s"], reverse=True)
+    return entries[:limit]
+
+class ProgressReporter:
+    """
+    Reports the progress of a conversion: a live progress line with the throughput and the ETA (emitted
+    at most every interval seconds) and a summary of the statistics every summary_interval seconds.
+    
+    Both are logged at the INFO level, the progress line as a record with the "progress" attribute set
+    (see _ConsoleHandler).
+    """
+    def __init__(self, total: int, interval: float = 0.5, summary_interval: float = 30.0):
+        """
+        The constructor of the ProgressReporter Class.
+        
+        Args:
+            total: The number of files to be converted.
+            interval: The minimum number of seconds between two progress lines.
+            summary_interval: The number of seconds between two summaries, 0 to disable them.
+        """
+        self.total = total
+        self.interval = interval
+        self.summary_interval = summary_interval
+        self.started = time.monotonic()
+        self._next_line = self.started
+        self._next_summary = self.started + summary_interval if summary_interval > 0 else float("inf")
+        self._done = 0
+
+    def _describe(self, done: int) -> str:
+        """
+        Formats the number of converted files, the throughput and the ETA.
+        
+        Args:
+            done: The number of converted files.
+        """
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / rate if rate > 0 else 0.0
+        return (f"{done}/{self.total} files ({done / self.total * 100 if self.total else 100:.1f}%), "
+                f"{rate:.1f} files/s, ETA {datetime.timedelta(seconds=int(eta))}")
+
+    def update(self, stats: Dict, done: int) -> None:
+        """
+        Reports the progress if the interval has elapsed since the previous report.
+        
+        Args:
+            stats: The statistics of the conversion so far.
+            done: The number of converted files.
+        """
+        self._done = done
+        now = time.monotonic()
+        if now >= self._next_line:
+            self._next_line = now + self.interval
+            logger.info(self._describe(done), extra={"progress": True})
+        if now >= self._next_summary:
+            self._next_summary = now + self.summary_interval
+            logger.info(f"Progress: {self._describe(done)}, {stats['successful_files']} successful files, "
+                        f"{stats['error_files']} error files, {stats['invalid_labels']} invalid labels")
+
+    def finish(self) -> None:
+        """
+        Reports the final progress line, which is kept on the terminal.
+        """
+        logger.info(self._describe(self._done), extra={"progress": True, "final": True})
+
+class _ConsoleHandler(logging.StreamHandler):
+    """
+    Writes the log messages to the console, the warnings and errors prefixed with their level. The
+    progress records rewrite a single live line on a terminal and are dropped otherwise (e.g. job logs).
+    """
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.live = self.stream.isatty() if hasattr(self.stream, "isatty") else False
+        self._line_active = False
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        if record.levelno >= logging.WARNING:
+            return f"[{record.levelname}]: {message}"
+        return message
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if getattr(record, "progress", False):
+            if not self.live:
+                return
+            try:
+                final = getattr(record, "final", False)
+                self.stream.write(f"\r\033[K{self.format(record)}" + ("\n" if final else ""))
+                self.flush()
+                self._line_active = not final
+            except Exception:
+                self.handleError(record)
+            return
+        
+        if self._line_active:
+            # The message is written on its own line, the progress line is rewritten by the next update
+            self.stream.write("\r\033[K")
+            self._line_active = False
+        super().emit(record)
+
+class ErrorLog:
+    """
+    Buffers the error messages of a conversion and writes them in batches to the text log and, optionally,
+    as structured records (file, shape index, error code) to a JSONL file. The buffer is flushed when it
+    holds too many records, when too much time has passed since the last flush and when it is closed.
+    A log without a path never writes, its records are collected with drain() (used by the pool workers).
+    """
+    def __init__(self, path: Optional[str], jsonl_path: Optional[str] = None, max_records: int = 512,
+                 flush_interval: float = 2.0):
+        """
+        The constructor of the ErrorLog Class.
+        
+        Args:
+            path: The path to the text log file, None to keep the records in memory.
+            jsonl_path: The path to the structured JSONL log file, None to disable it.
+            max_records: The number of buffered records that triggers a flush.
+            flush_interval: The number of seconds after which the buffer is flushed.
+        """
+        self.path = path
+        self.jsonl_path = jsonl_path
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self.records: List[Tuple[str, Optional[str], Optional[int], str, str]] = []
+        self.count = 0
+        self._last_flush = time.monotonic()
+        self._text_file = None
+        self._jsonl_file = None
+
+    def __getstate__(self) -> Dict:
+        """
+        Drops the open file handles when the log is sent to another process.
+        """
+        state = self.__dict__.copy()
+        state["_text_file"] = None
+        state["_jsonl_file"] = None
+        return state
+
+    def write(self, filename: Optional[str], message: str, code: str = "error",
+              shape_index: Optional[int] = None) -> None:
+        """
+        Adds an error record to the buffer.
+        
+        Args:
+            filename: The name of the file that caused the error.
+            message: The error message.
+            code: A short machine-readable error code.
+            shape_index: The index of the shape that caused the error, if any.
+        """
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.records.append((timestamp, filename, shape_index, code, message))
+        self.count += 1
+        self._maybe_flush()
+
+    def extend(self, records: List[Tuple[str, Optional[str], Optional[int], str, str]]) -> None:
+        """
+        Adds the records collected by another log (e.g. a pool worker) to the buffer.
+        
+        Args:
+            records: The error records.
+        """
+        if records:
+            self.records.extend(records)
+            self.count += len(records)
+            self._maybe_flush()
+
+    def drain(self) -> List[Tuple[str, Optional[str], Optional[int], str, str]]:
+        """
+        Removes and returns the buffered records.
+        """
+        records, self.records = self.records, []
+        return records
+
+    def _maybe_flush(self) -> None:
+        """
+        Flushes the buffer if one of the thresholds has been reached.
+        """
+        if self.path is None:
+            return
+        if len(self.records) >= self.max_records or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered records to the log files.
+        """
+        self._last_flush = time.monotonic()
+        if self.path is None or not self.records:
+            return
+        
+        if self._text_file is None:
+            self._text_file = open(self.path, "a", encoding="utf-8")
+        lines = []
+        for timestamp, filename, shape_index, code, message in self.records:
+            file_info = f"File: {filename}" if filename else "Unknown file"
+            lines.append(f"[{timestamp}] {file_info} - {message}\n")
+        self._text_file.write("".join(lines))
+        self._text_file.flush()
+        
+        if self.jsonl_path is not None:
+            if self._jsonl_file is None:
+                self._jsonl_file = open(self.jsonl_path, "a", encoding="utf-8")
+            self._jsonl_file.write("".join(
+                json.dumps({"time": timestamp, "file": filename, "shape_index": shape_index,
+                            "code": code, "message": message}, ensure_ascii=False) + "\n"
+                for timestamp, filename, shape_index, code, message in self.records))
+            self._jsonl_file.flush()
+        
+        self.records = []
+
+    def close(self) -> None:
+        """
+        Flushes the buffer and closes the log files.
+        """
+        self.flush()
+        for f in (self._text_file, self._jsonl_file):
+            if f is not None:
+                f.close()
+        self._text_file = None
+        self._jsonl_file = None
+
+class _JsonlRecords:
+    """
+    Entries kept across runs in a JSONL file, one JSON object per line. The entries are appended as soon
+    as they are recorded, which lets an interrupted run resume where it stopped; when the file is read the
+    last entry of a key wins, and the file is compacted to one entry per key when it is closed. The source
+    paths are stored relative to the source directory, so the records stay valid when the working directory
+    or the form of the source path (relative or absolute) changes between runs.
+    """
+    def __init__(self, path: str, key_field: str, root: str):
+        """
+        The constructor of the _JsonlRecords Class.
+        
+        Args:
+            path: The path to the JSONL file.
+            key_field: The field of the entries holding their key.
+            root: The source directory that the stored paths are relative to.
+        """
+        self.path = path
+        self.key_field = key_field
+        self.root = root
+        self.entries: Dict[str, Dict] = {}
+        self.changed = False
+        self._file = None
+        self._load()
+
+    def __getstate__(self) -> Dict:
+        """
+        Drops the open file handle when the entries are sent to another process (which only reads them).
+        """
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def _relative(self, path: str) -> str:
+        """
+        Returns the stored form of a source path (relative to the source directory).
+        
+        Args:
+            path: The path to the source file.
+        """
+        return os.path.relpath(path, self.root)
+
+    def _resolve(self, stored: str) -> str:
+        """
+        Returns the path of a source file from its stored form.
+        
+        Args:
+            stored: The path relative to the source directory.
+        """
+        return os.path.join(self.root, stored)
+
+    def _load(self) -> None:
+        """
+        Reads the entries of the previous runs.
+        """
+        if not os.path.exists(self.path):
+            return
+        
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may have been cut short by an interrupted run
+                    continue
+                self.entries[entry[self.key_field]] = entry
+
+    def _append(self, entry: Dict) -> None:
+        """
+        Records an entry and appends it to the file immediately.
+        
+        Args:
+            entry: The entry, its key is in the key field.
+        """
+        self.entries[entry[self.key_field]] = entry
+        self.changed = True
+        
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Rewrites the file with a single entry per key if the entries have changed.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self.changed:
+            return
+        
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+class ConversionManifest(_JsonlRecords):
+    """
+    Keeps a record of the converted (tiff, json) pairs in the target directory so that a rerun can skip
+    the unchanged ones (see _JsonlRecords for the file).
+    """
+    def __init__(self, path: str, version: str, root: str):
+        """
+        The constructor of the ConversionManifest Class.
+        
+        Args:
+            path: The path to the manifest file.
+            version: The version of the conversion settings (task and label mapping).
+            root: The source directory.
+        """
+        super().__init__(path, "json", root)
+        self.version = version
+
+    @staticmethod
+    def _signature(path: str, with_hash: bool) -> Dict[str, Union[int, str]]:
+        """
+        Builds the signature (mtime, size and optionally the content hash) of a file.
+        
+        Args:
+            path: The path to the file.
+            with_hash: Whether the content hash should be computed.
+        """
+        st = os.stat(path)
+        signature = {"mtime": st.st_mtime_ns, "size": st.st_size}
+        if with_hash:
+            signature["sha1"] = _hash_file(path)
+        return signature
+
+    def _matches(self, path: str, signature: Dict[str, Union[int, str]]) -> bool:
+        """
+        Checks if a file still matches its recorded signature. The content hash is only computed when
+        the size is the same but the modification time has changed.
+        
+        Args:
+            path: The path to the file.
+            signature: The recorded signature of the file.
+        """
+        st = os.stat(path)
+        if st.st_size != signature["size"]:
+            return False
+        if st.st_mtime_ns == signature["mtime"]:
+            return True
+        if "sha1" not in signature or _hash_file(path) != signature["sha1"]:
+            return False
+        
+        signature["mtime"] = st.st_mtime_ns
+        self.changed = True
+        return True
+
+    def is_unchanged(self, key: str, json_file: str, outputs: List[str]) -> bool:
+        """
+        Checks if a pair was converted with the current settings and its sources have not changed since.
+        
+        Args:
+            key: The key of the pair in the manifest.
+            json_file: The path to the JSON file.
+            outputs: The files that the conversion of the pair is expected to have produced.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry.get("version") != self.version:
+            return False
+        
+        try:
+            if not all(os.path.exists(output) for output in outputs):
+                return False
+            return self._matches(json_file, entry["json_signature"]) and \
+                self._matches(self._resolve(entry["image"]), entry["image_signature"])
+        except (OSError, KeyError):
+            return False
+
+    def get_image(self, key: str) -> Optional[str]:
+        """
+        Returns the source image recorded for a pair.
+        
+        Args:
+            key: The key of the pair in the manifest.
+        """
+        entry = self.entries.get(key)
+        return self._resolve(entry["image"]) if entry and "image" in entry else None
+
+    def get_sample(self, key: str) -> Optional[Dict]:
+        """
+        Returns the sample record (hashes and classes) of a pair, if it was recorded for a split.
+        
+        Args:
+            key: The key of the pair in the manifest.
+        """
+        entry = self.entries.get(key)
+        return entry.get("sample") if entry else None
+
+    def get_slot(self, key: str) -> Optional[int]:
+        """
+        Returns the output slot (position in the sharded layout) of a pair converted with the current settings.
+        
+        Args:
+            key: The key of the pair in the manifest.
+        """
+        entry = self.entries.get(key)
+        return entry.get("slot") if entry and entry.get("version") == self.version else None
+
+    def record(self, key: str, json_file: str, image_file: str, sample: Optional[Dict] = None,
+               slot: Optional[int] = None) -> None:
+        """
+        Records a converted pair and appends it to the manifest file immediately.
+        
+        Args:
+            key: The key of the pair in the manifest.
+            json_file: The path to the JSON file.
+            image_file: The path to the source image of the pair.
+            sample: The sample record of the pair for the dataset split, if any.
+            slot: The output slot of the pair in the sharded layout, if any.
+        """
+        entry = {
+            "json": key,
+            "version": self.version,
+            "json_signature": self._signature(json_file, with_hash=True),
+            # Images are only compared by mtime and size, hashing them would cost as much as copying them
+            "image": self._relative(image_file),
+            "image_signature": self._signature(image_file, with_hash=False)
+        }
+        if sample is not None:
+            entry["sample"] = sample
+        if slot is not None:
+            entry["slot"] = slot
+        self._append(entry)
+
+class HashCache(_JsonlRecords):
+    """
+    Keeps the content hashes of the source images across runs, so that an image whose size and modification
+    time have not changed is never hashed again (see _JsonlRecords for the file).
+    """
+    def __init__(self, path: str, root: str):
+        """
+        The constructor of the HashCache Class.
+        
+        Args:
+            path: The path to the cache file.
+            root: The source directory.
+        """
+        super().__init__(path, "image", root)
+
+    def get(self, image_file: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        """
+        Returns the cached hash of an image if the image has not changed since it was hashed.
+        
+        Args:
+            image_file: The path to the image.
+            
+        Returns:
+            tuple: The hash and the signature (mtime, size) of the image, or None if it has to be hashed.
+        """
+        entry = self.entries.get(self._relative(image_file))
+        if entry is None:
+            return None
+        st = os.stat(image_file)
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime"]:
+            return None
+        return entry["sha1"], {"mtime": entry["mtime"], "size": entry["size"]}
+
+    def record(self, image_file: str, sha1: str, signature: Dict[str, int]) -> None:
+        """
+        Records the hash of an image, unless it is already known.
+        
+        Args:
+            image_file: The path to the image.
+            sha1: The hexadecimal SHA-1 digest of the image.
+            signature: The mtime and size of the image when it was hashed.
+        """
+        entry = {"image": self._relative(image_file), "sha1": sha1, **signature}
+        if self.entries.get(entry["image"]) != entry:
+            self._append(entry)
+
+class TarShardWriter:
+    """
+    Writes the converted samples into webdataset-style tar shards: the members of a sample share its key
+    ({key}.txt, {key}.tiff, ...) and a new shard is started every shard_size samples. The position of
+    every sample is kept for the index file. The writes are serialized, so the writer can be shared by
+    threads.
+    """
+    def __init__(self, directory: str, shard_size: int):
+        """
+        The constructor of the TarShardWriter Class.
+        
+        Args:
+            directory: The directory of the shards.
+            shard_size: The number of samples per shard.
+        """
+        self.directory = directory
+        self.shard_size = shard_size
+        self.entries: List[Dict] = []
+        self._lock = threading.Lock()
+        self._tar: Optional[tarfile.TarFile] = None
+        self._shard = -1
+        self._count = 0
+
+    def _shard_name(self) -> str:
+        return f"shard-{self._shard:05d}.tar"
+
+    def add(self, stem: str, key: str, members: List[Tuple[str, Union[bytes, str]]], mtime: float) -> int:
+        """
+        Appends a sample to the current shard.
+        
+        Args:
+            stem: The path of the source JSON file without extension, relative to the source directory.
+            key: The key of the sample in the shard.
+            members: The extension and the content (bytes, or the path of a file to copy) of each member.
+            mtime: The modification time of the members created from bytes.
+            
+        Returns:
+            int: The number of bytes copied from files.
+        """
+        copied = 0
+        with self._lock:
+            if self._tar is None or self._count >= self.shard_size:
+                self._next_shard()
+            
+            offset = self._tar.offset
+            positions = {}
+            for extension, content in members:
+                info = tarfile.TarInfo(f"{key}.{extension}")
+                if isinstance(content, bytes):
+                    info.size = len(content)
+                    info.mtime = int(mtime)
+                    self._tar.addfile(info, io.BytesIO(content))
+                else:
+                    st = os.stat(content)
+                    info.size = st.st_size
+                    info.mtime = int(st.st_mtime)
+                    with open(content, "rb") as f:
+                        self._tar.addfile(info, f)
+                    copied += info.size
+                # The data ends at the current offset, padded to a whole number of blocks
+                padded = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                positions[extension] = [self._tar.offset - padded, info.size]
+            
+            self.entries.append({"stem": stem, "shard": self._shard_name(), "offset": offset,
+                                 "key": key, "members": positions})
+            self._count += 1
+        return copied
+
+    def _next_shard(self) -> None:
+        """
+        Closes the current shard and starts the next one.
+        """
+        if self._tar is not None:
+            self._tar.close()
+        self._shard += 1
+        self._count = 0
+        self._tar = tarfile.open(os.path.join(self.directory, self._shard_name()), "w", format=tarfile.GNU_FORMAT)
+
+    def close(self) -> None:
+        """
+        Closes the current shard.
+        """
+        with self._lock:
+            if self._tar is not None:
+                self._tar.close()
+                self._tar = None
+
+class LabelArrays:
+    """
+    A converted dataset in compact form: the label coordinates of all the files in one contiguous float32
+    buffer, with offset arrays instead of per-line strings.
+    
+    The labels of file i are the labels file_offsets[i] to file_offsets[i + 1], label j has the class
+    class_ids[j] and the coordinates coords[label_offsets[j]:label_offsets[j + 1]] (normalized
+    x_center, y_center, width, height for detection, normalized x1, y1, ..., xn, yn for segmentation).
+    """
+    def __init__(self, task: str, classes: List[str], files: List[str], images: List[str],
+                 file_offsets: "np.ndarray", class_ids: "np.ndarray", label_offsets: "np.ndarray",
+                 coords: "np.ndarray"):
+        """
+        The constructor of the LabelArrays Class.
+        
+        Args:
+            task: The task of the labels ('detection' or 'segmentation').
+            classes: The class names, indexed by class id.
+            files: The JSON files of the dataset, relative to the source directory.
+            images: The source images of the files.
+            file_offsets: The index of the first label of each file, followed by the number of labels (int64).
+            class_ids: The class id of each label (int32).
+            label_offsets: The index of the first coordinate of each label, followed by the number of coordinates (int64).
+            coords: The normalized coordinates of all the labels (float32).
+        """
+        self.task = task
+        self.classes = classes
+        self.files = files
+        self.images = images
+        self.file_offsets = file_offsets
+        self.class_ids = class_ids
+        self.label_offsets = label_offsets
+        self.coords = coords
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def labels(self, index: int) -> List[Tuple[int, "np.ndarray"]]:
+        """
+        Returns the labels of a file.
+        
+        Args:
+            index: The index of the file.
+            
+        Returns:
+            list: The class id and the coordinates (a view of the buffer) of each label of the file.
+        """
+        first, last = int(self.file_offsets[index]), int(self.file_offsets[index + 1])
+        offsets = self.label_offsets[first:last + 1].tolist()
+        return [(int(self.class_ids[first + k]), self.coords[offsets[k]:offsets[k + 1]])
+                for k in range(last - first)]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the dataset as a single uncompressed .npz shard, which load() can memory-map.
+        
+        Args:
+            path: The path of the .npz file.
+        """
+        meta = json.dumps({"task": self.task, "classes": self.classes, "files": self.files, "images": self.images})
+        with open(path, "wb") as f:
+            np.savez(f, file_offsets=self.file_offsets, class_ids=self.class_ids,
+                     label_offsets=self.label_offsets, coords=self.coords,
+                     meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LabelArrays":
+        """
+        Loads a dataset saved with save().
+        
+        Args:
+            path: The path of the .npz file.
+            mmap: Whether the arrays are memory-mapped instead of read into memory.
+            
+        Returns:
+            LabelArrays: The dataset.
+        """
+        if np is None:
+            raise ImportError("LabelArrays requires NumPy to be installed")
+        
+        if mmap:
+            arrays = _memmap_npz(path)
+        else:
+            with np.load(path) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        meta = json.loads(bytes(arrays.pop("meta")).decode("utf-8"))
+        return cls(meta["task"], meta["classes"], meta["files"], meta["images"], **arrays)
+
+def _memmap_npz(path: str) -> Dict[str, "np.ndarray"]:
+    """
+    Memory-maps the arrays of an uncompressed .npz file, the members are located in the zip archive and
+    mapped where their data starts.
+    
+    Args:
+        path: The path of the .npz file.
+        
+    Returns:
+        Dict: The read-only arrays by name.
+        
+    Raises:
+        ValueError: If a member is compressed.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Compressed member cannot be memory-mapped: {info.filename}")
+            
+            # The data follows the local file header, the name and the extra field of the member
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            
+            name = info.filename[:-len(".npy")]
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                         order="F" if fortran_order else "C")
+    return arrays
+
 class JsonToYolo:
-    def __init__(self, path: str, target: str, task: str):
+    def __init__(self, path: str, target: str, task: Union[str, Tuple[str, ...]], workers: int = 1, incremental: bool = False,
+                 image_mode: str = "copy", structured_errors: bool = False, kernel: str = "python",
+                 json_parser: str = "stream", image_extensions: Tuple[str, ...] = (".tiff",),
+                 scan_workers: int = 1, pipeline: bool = False, io_threads: int = 4,
+                 read_queue_depth: int = 16, write_queue_depth: int = 16, timings: bool = False,
+                 timings_path: Optional[str] = None, profile_path: Optional[str] = None, progress: bool = True,
+                 summary_interval: float = 30.0, output_layout: str = "flat", shard_size: int = 1000,
+                 label_map: Optional[Union[str, Dict, List]] = None, scan_labels: bool = False,
+                 simplify_tolerance: float = 0.0, max_vertices: int = 0,
+                 split: Optional[Tuple[float, ...]] = None, split_seed: int = 0):
+        """
+        The constructor of the JsonToYolo Class.
+        
+        Args:
+            path: The path to the source directory containing the files.
+            target: The path to the target directory where the converted files will be saved.
+            task: The task type ('detection' or 'segmentation'), or several of them to convert each JSON file
+                once for all of them (the image is stored once and shared between the task directories).
+            workers: The number of worker processes used for the conversion (1 converts serially).
+            incremental: Whether the pairs that have not changed since the previous run should be skipped.
+            image_mode: How the images are materialized in the target directory
+                ('copy', 'hardlink', 'symlink', 'reflink' or 'none').
+            structured_errors: Whether the errors should also be written to label_errors.jsonl.
+            kernel: The shape normalization kernel ('python' or 'numpy', which requires NumPy).
+            json_parser: The JSON parser ('stream' drops the embedded image data, 'full' loads everything).
+            image_extensions: The extensions of the image files paired with the JSON files.
+            scan_workers: The number of threads scanning the directories below the source directory.
+            pipeline: Whether the reads, the conversion and the writes overlap (cannot be combined with workers).
+            io_threads: The number of threads of each of the read and write stages of the pipeline.
+            read_queue_depth: The number of JSON files read ahead of the conversion in the pipeline.
+            write_queue_depth: The number of converted files waiting to be written in the pipeline.
+            timings: Whether the durations of the phases and of each file are recorded (stats["timings"]).
+            timings_path: The path of a JSON file where the timings are dumped (enables the timings).
+            profile_path: The path of a cProfile output file for the main process, None to disable profiling.
+            progress: Whether the progress is reported (see ProgressReporter).
+            summary_interval: The number of seconds between two progress summaries, 0 to disable them.
+            output_layout: The layout of the outputs: 'flat' (one directory per task), 'sharded' (subdirectories
+                of shard_size pairs) or 'tar' (tar shards of shard_size samples), see _assign_outputs.
+            shard_size: The number of pairs per shard of the sharded and tar layouts.
+            label_map: The label mapping: the path to a JSON/YAML file or a specification (see
+                _compile_label_mapping), None for the default labels (or the scanned ones with scan_labels).
+            scan_labels: Whether the labels of all the JSON files are collected before the conversion, to report
+                the unknown labels at once or, without label_map, to build the mapping and classes.txt from them.
+            simplify_tolerance: The Douglas-Peucker tolerance of the segmentation polygons in pixels, 0 to keep
+                every vertex (see _simplify_polygon).
+            max_vertices: The largest number of vertices of a segmentation polygon, 0 for no limit.
+            split: The train, val and (optionally) test ratios of the dataset split written after the
+                conversion (see _split_dataset), None to skip the split and the image hashing.
+            split_seed: The seed of the deterministic order of the samples in the split.
+        """
+        self.path = path 
+        self.tasks = (task,) if isinstance(task, str) else tuple(dict.fromkeys(task))
+        for name in self.tasks:
+            if name not in TASKS:
+                raise ValueError(f"Unsupported task: {name}")
+        if not self.tasks:
+            raise ValueError("At least one task is required")
+        # The first task directory holds the stored images and the manifest
+        self.targets = {name: os.path.join(target, name) for name in self.tasks}
+        self.task = self.tasks[0]
+        self.target = self.targets[self.task]
+        self.workers = max(1, workers)
+        if image_mode not in IMAGE_MODES:
+            raise ValueError(f"Unsupported image mode: {image_mode}")
+        self.image_mode = image_mode
+        if kernel not in KERNELS:
+            raise ValueError(f"Unsupported kernel: {kernel}")
+        if kernel == "numpy" and np is None:
+            raise ValueError("The numpy kernel requires NumPy to be installed")
+        self.kernel = kernel
+        if json_parser not in JSON_PARSERS:
+            raise ValueError(f"Unsupported JSON parser: {json_parser}")
+        self.json_parser = json_parser
+        self.image_extensions = tuple(
+            (extension if extension.startswith(".") else f".{extension}").lower() for extension in image_extensions)
+        self.scan_workers = max(1, scan_workers)
+        if pipeline and self.workers > 1:
+            raise ValueError("The pipeline mode cannot be combined with several worker processes")
+        self.pipeline = pipeline
+        self.io_threads = max(1, io_threads)
+        self.read_queue_depth = max(1, read_queue_depth)
+        self.write_queue_depth = max(1, write_queue_depth)
+        
+        # The timings are recorded by wrapping the timed methods, nothing is measured when they are disabled
+        self.timings_path = timings_path
+        self.timings: Optional[PhaseTimings] = PhaseTimings() if timings or timings_path else None
+        if self.timings is not None:
+            self._install_timings()
+        self.profile_path = profile_path
+        self.progress = progress
+        self.summary_interval = summary_interval
+        self.progress_reporter: Optional[ProgressReporter] = None
+        if output_layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"Unsupported output layout: {output_layout}")
+        if output_layout == "tar" and self.workers > 1:
+            raise ValueError("The tar layout cannot be combined with several worker processes")
+        if output_layout == "tar" and incremental:
+            raise ValueError("The tar layout cannot be combined with the incremental mode")
+        if output_layout == "tar" and split:
+            raise ValueError("The tar layout cannot be combined with the dataset split")
+        if image_mode == "none" and split:
+            # YOLO looks for the labels next to the listed images, which are then outside the task directory
+            raise ValueError("The image mode none cannot be combined with the dataset split")
+        self.output_layout = output_layout
+        self.shard_size = max(1, shard_size)
+        # The shard, the position in the shard and the output name of each JSON file (see _assign_outputs)
+        self._outputs: Dict[str, Tuple[int, int, str]] = {}
+        self._indexed: List[str] = []
+        self.shard_writer: Optional[TarShardWriter] = None
+        self.error_log_path = os.path.join(target, "label_errors.txt")
+        self.error_log = ErrorLog(self.error_log_path,
+                                  os.path.join(target, "label_errors.jsonl") if structured_errors else None)
+        
+        # Define label mapping as a class attribute, compiled once into the label to class id lookup
+        # (including the aliases) and the class names indexed by class id
+        if isinstance(label_map, str):
+            label_map = load_label_mapping(label_map)
+        self.label_map_given = label_map is not None
+        self.label_mapping, self.class_names = _compile_label_mapping(label_map if label_map is not None else {
+            'label1': 0,
+            'label2': 1,
+            'label3': 2,
+            'label4': 3
+        })
+        self.scan_labels = scan_labels
+        if simplify_tolerance < 0 or max_vertices < 0:
+            raise ValueError("The simplification tolerance and the vertex limit cannot be negative")
+        self.simplify_tolerance = simplify_tolerance
+        self.max_vertices = max_vertices
+        if split is not None and (len(split) not in (2, 3) or min(split) < 0 or sum(split) <= 0):
+            raise ValueError("The split needs 2 or 3 non-negative ratios (train, val, test)")
+        self.split = tuple(ratio / sum(split) for ratio in split) if split is not None else None
+        self.split_seed = split_seed
+        # The image hash, label hash and classes of each converted pair, collected for the split
+        self._samples: Dict[str, Tuple[str, Dict]] = {}
+        
+        # Create target directories if they don't exist
+        for task_target in self.targets.values():
+            os.makedirs(task_target, exist_ok=True) 
+        self._create_classes_file()
+        
+        # The manifest of the converted pairs, only used in incremental mode
+        self.manifest: Optional[ConversionManifest] = None
+        if incremental:
+            self.manifest = ConversionManifest(os.path.join(self.target, ".labelme2yolo_manifest.jsonl"),
+                                               self._mapping_version(), self.path)
+        
+        # The content hashes of the images, kept across runs when the dataset is split
+        self.hash_cache: Optional[HashCache] = None
+        if self.split is not None:
+            self.hash_cache = HashCache(os.path.join(self.target, ".labelme2yolo_hashes.jsonl"), self.path)
+        
+        # Define statistics as a class attribute
+        self.stats = self._empty_stats(self.tasks)
+
+    @staticmethod
+    def _empty_stats(tasks: Tuple[str, ...] = ()) -> Dict[str, int]:
+        """
+        Creates a statistics dictionary with all counters set to zero.
+        
+        stats["simplified_files"] lists the (file, vertices in, vertices out, max error) of the files whose
+        polygons were simplified.
+        
+        With several tasks, the file and label counters count each JSON file and shape once (a file is
+        successful if at least one task produced its labels, a shape is invalid if at least one task
+        rejected it) and stats["tasks"] holds the counters of each task.
+        
+        Args:
+            tasks: The tasks of the conversion.
+        
+        Returns:
+            Dict: The statistics dictionary.
+        """
+        stats = {
+            "processed_files": 0,
+            "successful_files": 0,
+            "error_files": 0,
+            "processed_labels": 0,
+            "invalid_labels": 0,
+            "skipped_files": 0,
+            "image_bytes_copied": 0,
+            "image_fallback_copies": 0,
+            "orphan_jsons": 0,
+            "orphan_images": 0,
+            "name_collisions": 0,
+            "vertices_in": 0,
+            "vertices_out": 0,
+            "simplified_files": [],
+            "hashed_images": 0,
+            "hash_cache_hits": 0
+        }
+        if len(tasks) > 1:
+            stats["tasks"] = {task: dict.fromkeys(_TASK_COUNTERS, 0) for task in tasks}
+        return stats
+
+    @staticmethod
+    def _count_file(stats: Dict, key: str, tasks: Optional[Tuple[str, ...]] = None) -> None:
+        """
+        Increments a file counter, and the counter of each task for the statistics of a multi-task run.
+        
+        Args:
+            stats: The statistics dictionary to be updated.
+            key: The name of the counter.
+            tasks: The tasks whose counter is incremented, None for all of them.
+        """
+        stats[key] += 1
+        for task, task_stats in stats.get("tasks", {}).items():
+            if tasks is None or task in tasks:
+                task_stats[key] += 1
+
+    def __getstate__(self) -> Dict:
+        """
+        Drops the members that cannot be sent to the process pool workers.
+        """
+        state = self.__dict__.copy()
+        state["manifest"] = None
+        state["error_log"] = None
+        state["progress_reporter"] = None
+        state["shard_writer"] = None
+        state["_samples"] = {}
+        # The timing wrappers are installed again by the workers
+        for name in chain(chain.from_iterable(_TIMED_PHASES.values()), _TIMED_FILE_METHODS):
+            state.pop(name, None)
+        return state
+
+    def _install_timings(self) -> None:
+        """
+        Replaces the timed methods of this instance by wrappers recording their durations.
+        """
+        timings = self.timings
+        
+        def timed(phase, method):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    timings.add(phase, time.perf_counter() - start)
+            return wrapper
+        
+        def timed_file(method):
+            def wrapper(json_file, stats):
+                start = time.perf_counter()
+                try:
+                    return method(json_file, stats)
+                finally:
+                    timings.add_file(json_file, time.perf_counter() - start)
+            return wrapper
+        
+        for phase, names in _TIMED_PHASES.items():
+            for name in names:
+                setattr(self, name, timed(phase, getattr(type(self), name).__get__(self)))
+        for name in _TIMED_FILE_METHODS:
+            setattr(self, name, timed_file(getattr(type(self), name).__get__(self)))
+
+    def _mapping_version(self) -> str:
+        """
+        Computes a version string of the conversion settings, a change invalidates the manifest entries.
+        
+        Returns:
+            str: The version of the task and the label mapping.
+        """
+        task = self.task if len(self.tasks) == 1 else list(self.tasks)
+        settings = {"task": task, "label_mapping": self.label_mapping}
+        if self.simplify_tolerance or self.max_vertices:
+            settings["simplify"] = [self.simplify_tolerance, self.max_vertices]
+        if self.output_layout != "flat":
+            settings["layout"] = [self.output_layout, self.shard_size]
+        settings = json.dumps(settings, sort_keys=True)
+        return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:16]
+
+    def _assign_outputs(self, pairs: List[Tuple[str, str]]) -> None:
+        """
+        Assigns the shard and the output name of each pair. In the sharded and tar layouts the pairs are
+        split in order into shards of shard_size pairs and named after their path relative to the source
+        directory ('sub/img' becomes 'sub__img'), so files with the same name in different subdirectories
+        do not collide. In the flat layout such collisions are reported.
+        
+        In incremental mode the pairs converted by a previous run keep their slot (shard and position) and
+        the new pairs are appended after the last one, so adding a file does not move the others to
+        another shard.
+        
+        Args:
+            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+        """
+        if self.output_layout == "flat":
+            seen: Dict[str, str] = {}
+            for tiff, json_file in pairs:
+                name = os.path.basename(json_file)
+                if name in seen:
+                    error_msg = f"Output name collision with {seen[name]}, its outputs are overwritten"
+                    logger.warning(f"{json_file}: {error_msg}")
+                    self._log_error(json_file, error_msg, code="name_collision")
+                    self.stats["name_collisions"] += 1
+                else:
+                    seen[name] = json_file
+            return
+        
+        slots: Dict[str, int] = {}
+        if self.manifest is not None:
+            for tiff, json_file in pairs:
+                slot = self.manifest.get_slot(self._manifest_key(json_file))
+                if slot is not None:
+                    slots[json_file] = slot
+        next_slot = max(slots.values(), default=-1) + 1
+        
+        for tiff, json_file in pairs:
+            slot = slots.get(json_file)
+            if slot is None:
+                slot = next_slot
+                next_slot += 1
+            stem = os.path.splitext(self._manifest_key(json_file))[0]
+            self._outputs[json_file] = (slot // self.shard_size, slot % self.shard_size, stem.replace(os.sep, "__"))
+        
+        if self.output_layout == "sharded":
+            for shard in range(-(-next_slot // self.shard_size)):
+                for task_target in self.targets.values():
+                    os.makedirs(os.path.join(task_target, f"shard_{shard:05d}"), exist_ok=True)
+        else:
+            self.shard_writer = TarShardWriter(self.target, self.shard_size)
+
+    def _output_directory(self, json_file: str, task: Optional[str] = None) -> str:
+        """
+        Returns the directory of the outputs of a JSON file.
+        
+        Args:
+            json_file: The path to the JSON file.
+            task: The task of the outputs, None for the first task.
+        """
+        task_target = self.targets[task or self.task]
+        if self.output_layout == "sharded":
+            return os.path.join(task_target, f"shard_{self._outputs[json_file][0]:05d}")
+        return task_target
+
+    def _label_output_path(self, json_file: str, task: Optional[str] = None) -> str:
+        """
+        Returns the path of the YOLO label file produced for a JSON file.
+        
+        Args:
+            json_file: The path to the JSON file.
+            task: The task of the label file, None for the first task.
+        """
+        if self.output_layout == "sharded":
+            return os.path.join(self._output_directory(json_file, task), self._outputs[json_file][2] + ".txt")
+        return os.path.join(self.targets[task or self.task], os.path.basename(json_file).replace('.json', '.txt'))
+
+    def _image_output_path(self, image_file: str, json_file: Optional[str] = None, task: Optional[str] = None) -> str:
+        """
+        Returns the path of the image placed in the target directory for a JSON file.
+        
+        Args:
+            image_file: The path to the source image.
+            json_file: The path to the JSON file, None in the flat layout.
+            task: The task of the outputs, None for the first task.
+        """
+        if self.output_layout == "sharded" and json_file is not None:
+            return os.path.join(self._output_directory(json_file, task),
+                                self._outputs[json_file][2] + os.path.splitext(image_file)[1])
+        return os.path.join(self.targets[task or self.task], os.path.basename(image_file))
+
+    def _write_index(self) -> None:
+        """
+        Writes the index of the sharded and tar layouts (index.jsonl): the stem of each converted source
+        file, its shard, its offset (position in the shard directory, or byte offset of its first member
+        in the tar shard) and its output name, plus the data offset and size of each tar member.
+        """
+        if self.output_layout == "flat":
+            return
+        
+        if self.shard_writer is not None:
+            self.shard_writer.close()
+            entries = self.shard_writer.entries
+        else:
+            entries = []
+            for json_file in sorted(self._indexed, key=lambda path: self._outputs[path][:2]):
+                shard, offset, name = self._outputs[json_file]
+                entries.append({"stem": os.path.splitext(self._manifest_key(json_file))[0],
+                                "shard": f"shard_{shard:05d}", "offset": offset, "key": name})
+        
+        with open(os.path.join(self.target, "index.jsonl"), "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def _sample_record(self, digest: Tuple[str, Dict[str, int]], labels_by_task: Dict[str, List[str]]) -> Dict:
+        """
+        Builds the record of a converted pair used by the dataset split.
+        
+        Args:
+            digest: The SHA-1 hash and the signature (mtime, size) of the image.
+            labels_by_task: The YOLO label lines of each task that produced labels.
+            
+        Returns:
+            Dict: The image hash and signature, the hash of the labels, the class ids and the tasks of the pair.
+        """
+        labels_text = "\n".join(f"{task}\n" + "\n".join(labels_by_task[task]) for task in sorted(labels_by_task))
+        return {
+            "image_sha1": digest[0],
+            "image_signature": digest[1],
+            "labels_sha1": hashlib.sha1(labels_text.encode("utf-8")).hexdigest(),
+            "classes": sorted({int(label.split(" ", 1)[0]) for labels in labels_by_task.values() for label in labels}),
+            "tasks": list(labels_by_task)
+        }
+
+    def _split_dataset(self) -> None:
+        """
+        Splits the converted pairs into train, val and test lists after removing the duplicates. Pairs with the
+        same image and the same labels are duplicates, only the first one (in path order) is kept. Pairs sharing
+        an image with different labels are kept but reported, and always put in the same split so that no image
+        is both in train and in val or test.
+        
+        The groups of pairs sharing an image are stratified by their rarest class and ordered by the hash of the
+        seed and of the image, then each group goes to the split that is the furthest below its ratio. The split
+        only depends on the content of the dataset and the seed, and every class is spread over the splits
+        close to the ratios. The lists and a YOLO data.yaml are written in each task directory.
+        """
+        groups: Dict[str, List[Tuple[str, str, Dict]]] = {}
+        for json_file in sorted(self._samples, key=self._manifest_key):
+            image_file, sample = self._samples[json_file]
+            groups.setdefault(sample["image_sha1"], []).append((json_file, image_file, sample))
+        
+        duplicates = conflicts = 0
+        kept_groups = []
+        for image_sha1, members in groups.items():
+            kept: Dict[str, Tuple[str, str, Dict]] = {}
+            for json_file, image_file, sample in members:
+                first = kept.get(sample["labels_sha1"])
+                if first is not None:
+                    self._log_error(json_file, f"Duplicate of {self._manifest_key(first[0])}: same image and labels",
+                                    code="duplicate")
+                    duplicates += 1
+                else:
+                    kept[sample["labels_sha1"]] = (json_file, image_file, sample)
+            
+            kept_members = list(kept.values())
+            for json_file, _, _ in kept_members[1:]:
+                self._log_error(json_file, f"Same image as {self._manifest_key(kept_members[0][0])} with different labels",
+                                code="conflicting_duplicate")
+                conflicts += 1
+            classes = set(chain.from_iterable(sample["classes"] for _, _, sample in kept_members))
+            kept_groups.append((image_sha1, kept_members, classes))
+        
+        frequency = Counter(chain.from_iterable(classes for _, _, classes in kept_groups))
+        
+        def order(group):
+            stratum = min(group[2], key=lambda class_id: (frequency[class_id], class_id)) if group[2] else -1
+            return stratum, hashlib.sha1(f"{self.split_seed}:{group[0]}".encode("utf-8")).hexdigest()
+        
+        names = ("train", "val", "test")[:len(self.split)]
+        splits: Dict[str, List[Tuple[str, str, Dict]]] = {name: [] for name in names}
+        counts = [0] * len(names)
+        for assigned, group in enumerate(sorted(kept_groups, key=order), 1):
+            index = max(range(len(names)), key=lambda i: self.split[i] * assigned - counts[i])
+            counts[index] += 1
+            splits[names[index]].extend(group[1])
+        
+        self._write_split_files(splits)
+        self.stats["split"] = {name: len(members) for name, members in splits.items()}
+        self.stats["duplicate_files"] = duplicates
+        self.stats["conflicting_duplicates"] = conflicts
+
+    def _write_split_files(self, splits: Dict[str, List[Tuple[str, str, Dict]]]) -> None:
+        """
+        Writes the image list of each split (splits/{split}.txt, absolute paths of the images in the task
+        directory) and a YOLO data.yaml in each task directory.
+        The lists are kept out of the task directory so that they cannot overwrite a label file.
+        
+        Args:
+            splits: The (JSON file, image file, sample record) of the pairs of each split.
+        """
+        for task, task_target in self.targets.items():
+            splits_directory = os.path.join(task_target, SPLITS_DIRECTORY)
+            os.makedirs(splits_directory, exist_ok=True)
+            for name, members in splits.items():
+                with open(os.path.join(splits_directory, f"{name}.txt"), "w", encoding="utf-8") as f:
+                    for json_file, image_file, sample in sorted(members, key=lambda member: self._manifest_key(member[0])):
+                        if task not in sample["tasks"]:
+                            continue
+                        f.write(os.path.abspath(self._image_output_path(image_file, json_file, task)) + "\n")
+            
+            # Written by hand so that PyYAML is not needed, JSON strings are valid YAML scalars
+            with open(os.path.join(task_target, "data.yaml"), "w", encoding="utf-8") as f:
+                f.write(f"path: {json.dumps(os.path.abspath(task_target), ensure_ascii=False)}\n")
+                for name in splits:
+                    f.write(f"{name}: {SPLITS_DIRECTORY}/{name}.txt\n")
+                f.write(f"nc: {len(self.class_names)}\n")
+                f.write("names:\n")
+                for class_id, class_name in enumerate(self.class_names):
+                    f.write(f"  {class_id}: {json.dumps(class_name, ensure_ascii=False)}\n")
+            logger.debug("Created: %s", os.path.join(task_target, "data.yaml"))
+
+    def _manifest_key(self, json_file: str) -> str:
+        """
+        Returns the key of a JSON file in the manifest (its path relative to the source directory).
+        
+        Args:
+            json_file: The path to the JSON file.
+        """
+        return os.path.relpath(json_file, self.path)
+
+    def _scan_vocabulary(self, pairs: List[Tuple[str, str]]) -> None:
+        """
+        Collects the labels of all the JSON files before the conversion, with a pool of processes when
+        several workers are configured. Without a given label mapping, the mapping and classes.txt are
+        built from the sorted labels; otherwise the labels missing from the mapping are reported at once.
+        The number of shapes of each label is stored in stats["labels"].
+        
+        Args:
+            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+        """
+        json_files = [json_file for tiff, json_file in pairs]
+        processes = max(self.workers, self.scan_workers)
+        vocabulary: Dict[str, int] = {}
+        if processes > 1 and len(json_files) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = executor.map(_scan_labels, json_files, chunksize=max(1, len(json_files) // (processes * 4)))
+                for counts in results:
+                    for label, count in counts.items():
+                        vocabulary[label] = vocabulary.get(label, 0) + count
+        else:
+            for json_file in json_files:
+                for label, count in _scan_labels(json_file).items():
+                    vocabulary[label] = vocabulary.get(label, 0) + count
+        self.stats["labels"] = dict(sorted(vocabulary.items()))
+        
+        if not self.label_map_given:
+            self.label_mapping, self.class_names = _compile_label_mapping(sorted(vocabulary))
+            self._create_classes_file()
+            if self.manifest is not None:
+                self.manifest.version = self._mapping_version()
+            logger.info(f"Label mapping built from {len(self.class_names)} scanned labels")
+            return
+        
+        unknown = {label: count for label, count in self.stats["labels"].items() if label not in self.label_mapping}
+        if unknown:
+            logger.warning("Labels not in the label mapping: " +
+                           ", ".join(f"{label} ({count} shapes)" for label, count in unknown.items()))
+            self._log_error(None, f"Labels not in the label mapping: {', '.join(unknown)}", code="unknown_labels")
+
+    def _filter_unchanged(self, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        Removes the pairs that have already been converted and have not changed since.
+        
+        Args:
+            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+            
+        Returns:
+            list: The pairs that still need to be converted.
+        """
+        if self.manifest is None:
+            return pairs
+        
+        remaining = []
+        for tiff, json_file in pairs:
+            key = self._manifest_key(json_file)
+            image_file = self.manifest.get_image(key)
+            outputs = [self._label_output_path(json_file, task) for task in self.tasks]
+            if image_file and self.image_mode != "none":
+                outputs.extend(self._image_output_path(image_file, json_file, task) for task in self.tasks)
+            
+            # The pairs converted without a split have no sample record yet
+            sample = self.manifest.get_sample(key) if self.split is not None else None
+            if image_file and (self.split is None or sample) and self.manifest.is_unchanged(key, json_file, outputs):
+                self.stats["skipped_files"] += 1
+                if self.output_layout == "sharded":
+                    self._indexed.append(json_file)
+                if sample is not None:
+                    self._samples[json_file] = (image_file, sample)
+            else:
+                remaining.append((tiff, json_file))
+        return remaining
+
+    def _load_json(self, json_file: str) -> Dict:
+        """
+        Loads a LabelMe JSON file. The streaming parser drops the embedded imageData without decoding it.
+        
+        Args:
+            json_file: The path to the JSON file.
+            
+        Returns:
+            Dict: The content of the JSON file.
+        """
+        if self.json_parser == "stream":
+            return _load_json_without(json_file, "imageData")
+        
+        with open(json_file) as f:
+            return json.load(f)
+
+    def _normalize_shapes(self, shapes: list, image_width: float, image_height: float,
+                          polygon: bool, formatted: bool = True) -> list:
+        """
+        Normalizes all the shapes of a file. The NumPy kernel processes the polygons at once, the Python
+        kernel (and the NumPy kernel on data that cannot be vectorized) one by one. The bounding boxes are
+        always computed one by one: converting the points to an array costs more than the whole Python path.
+        The polygons kept as values (formatted=False) are also normalized one by one.
+        
+        Args:
+            shapes: The shapes of the JSON file.
+            image_width: The width of the image.
+            image_height: The height of the image.
+            polygon: Whether the shapes are converted to polygons (otherwise to bounding boxes).
+            formatted: Whether the polygon coordinates are formatted as text (_normalize_polygon) or kept as
+                values (_polygon_values).
+            
+        Returns:
+            list: The result of _normalize_polygon (or _polygon_values) or _normalize_bbox for each shape, None for the shapes
+                without a label or points and the raised exception for the shapes that could not be normalized.
+        """
+        if self.kernel == "numpy" and polygon and formatted:
+            try:
+                shapes_points = [shape.get('points') if shape.get('label') else None for shape in shapes]
+                return _numpy_polygons(shapes_points, image_width, image_height)
+            except Exception:
+                # The per-shape path reports the exact error of each shape
+                pass
+        
+        if polygon:
+            normalize = _normalize_polygon if formatted else _polygon_values
+        else:
+            normalize = _normalize_bbox
+        results = []
+        for shape in shapes:
+            try:
+                points = shape.get('points') if shape.get('label') else None
+                results.append(normalize(points, image_width, image_height) if points else None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _simplify_shapes(self, json_file: str, shapes: list, stats: Dict) -> list:
+        """
+        Simplifies the polygons of a file when a tolerance or a vertex limit is set. The shapes that cannot
+        be simplified are left as they are for the normalization to report their error.
+        
+        Args:
+            json_file: The path to the JSON file (for the statistics).
+            shapes: The shapes of the JSON file.
+            stats: The statistics dictionary to be updated.
+            
+        Returns:
+            list: The shapes, with copies holding the kept points for the simplified polygons.
+        """
+        if not self.simplify_tolerance and not self.max_vertices:
+            return shapes
+        
+        simplified = []
+        vertices_in = vertices_out = 0
+        max_error = 0.0
+        for shape in shapes:
+            points = shape.get('points') if shape.get('label') else None
+            if points and len(points) > 3:
+                try:
+                    kept, error = _simplify_polygon(points, self.simplify_tolerance, self.max_vertices,
+                                                    vectorized=self.kernel == "numpy")
+                except Exception:
+                    kept, error = range(len(points)), 0.0
+                vertices_in += len(points)
+                vertices_out += len(kept)
+                max_error = max(max_error, error)
+                if len(kept) < len(points):
+                    shape = dict(shape, points=[points[i] for i in kept])
+            simplified.append(shape)
+        
+        if vertices_in:
+            stats["vertices_in"] += vertices_in
+            stats["vertices_out"] += vertices_out
+            stats["simplified_files"].append((self._manifest_key(json_file), vertices_in, vertices_out, max_error))
+        return simplified
+
+    def _materialize_image(self, image_file: str, stats: Dict[str, int], tasks: Optional[List[str]] = None,
+                           json_file: Optional[str] = None) -> Optional[Tuple[str, Dict[str, int]]]:
+        """
+        Places the image file in the target directory according to the image mode. Links and reflinks
+        fall back to a regular copy when the filesystem does not support them.
+        
+        With several tasks the image is stored once in the directory of the first one, the other task
+        directories get a hard link to it (or a symbolic link to the source in symlink mode).
+        
+        When the dataset is split, the content hash of the image is taken from the hash cache, computed
+        while the image is copied or, in the other image modes, read from the source.
+        
+        Args:
+            image_file: The path to the source image.
+            stats: The statistics dictionary to be updated.
+            tasks: The tasks whose directory receives the image, None for all of them.
+            json_file: The path to the JSON file of the image (names the image in the sharded layout).
+            
+        Returns:
+            tuple: The SHA-1 hash and the signature (mtime, size) of the image, None if the dataset is not split.
+        """
+        cached = self.hash_cache.get(image_file) if self.hash_cache is not None else None
+        if cached is not None:
+            stats["hash_cache_hits"] += 1
+        hash_content = self.hash_cache is not None and cached is None
+        signature = ConversionManifest._signature(image_file, with_hash=False) if hash_content else None
+        
+        sha1 = None
+        if self.image_mode != "none":
+            tasks = tasks or list(self.tasks)
+            destination = self._image_output_path(image_file, json_file, tasks[0])
+            sha1 = self._store_image(image_file, destination, stats, hash_content)
+            self._share_image(image_file, destination, stats, tasks[1:], json_file)
+        
+        if not hash_content:
+            return cached
+        stats["hashed_images"] += 1
+        return sha1 or _hash_file(image_file), signature
+
+    def _share_image(self, image_file: str, destination: str, stats: Dict[str, int], tasks: List[str],
+                     json_file: Optional[str] = None) -> None:
+        """
+        Links the stored image into the directories of the other tasks (see _materialize_image).
+        
+        Args:
+            image_file: The path to the source image.
+            destination: The path of the image stored in the directory of the first task.
+            stats: The statistics dictionary to be updated.
+            tasks: The other tasks whose directory receives the image.
+            json_file: The path to the JSON file of the image (names the image in the sharded layout).
+        """
+        for task in tasks:
+            shared = self._image_output_path(image_file, json_file, task)
+            if os.path.lexists(shared):
+                os.remove(shared)
+            try:
+                if self.image_mode == "symlink":
+                    os.symlink(os.path.abspath(image_file), shared)
+                else:
+                    os.link(destination, shared)
+            except OSError as e:
+                self._log_error(image_file, f"Sharing the image failed, falling back to copy: {str(e)}", code="image_fallback")
+                shutil.copy(image_file, shared)
+                stats["image_bytes_copied"] += os.path.getsize(image_file)
+                stats["image_fallback_copies"] += 1
+
+    def _store_image(self, image_file: str, destination: str, stats: Dict[str, int],
+                     hash_content: bool = False) -> Optional[str]:
+        """
+        Places the image file at the destination according to the image mode (see _materialize_image).
+        
+        Args:
+            image_file: The path to the source image.
+            destination: The path of the image in the target directory.
+            stats: The statistics dictionary to be updated.
+            hash_content: Whether a copy should compute the content hash of the image while reading it.
+            
+        Returns:
+            str: The SHA-1 hash of the image if it was computed while copying, None otherwise.
+        """
+        # Links cannot overwrite an existing file and a copy onto a link left by a previous run would
+        # write to the source, the output of a previous run is replaced
+        if os.path.lexists(destination):
+            os.remove(destination)
+        
+        if self.image_mode == "copy":
+            sha1 = None
+            if hash_content:
+                sha1 = _copy_file_hashed(image_file, destination)
+            else:
+                shutil.copy(image_file, destination)
+            stats["image_bytes_copied"] += os.path.getsize(image_file)
+            return sha1
+        
+        try:
+            if self.image_mode == "hardlink":
+                os.link(image_file, destination)
+            elif self.image_mode == "symlink":
+                os.symlink(os.path.abspath(image_file), destination)
+            elif self.image_mode == "reflink":
+                stats["image_bytes_copied"] += _reflink_file(image_file, destination)
+        except OSError as e:
+            self._log_error(image_file, f"{self.image_mode} failed, falling back to copy: {str(e)}", code="image_fallback")
+            shutil.copy(image_file, destination)
+            stats["image_bytes_copied"] += os.path.getsize(image_file)
+            stats["image_fallback_copies"] += 1
+
+    def _report_progress(self) -> None:
+        """
+        Reports the progress after a file has been converted.
+        """
+        if self.progress_reporter is not None:
+            self.progress_reporter.update(self.stats, self.stats["processed_files"])
+
+    def _record_converted(self, json_file: str, image_file: Optional[str]) -> None:
+        """
+        Records a successfully converted pair in the manifest.
+        
+        Args:
+            json_file: The path to the JSON file.
+            image_file: The path of the copied source image, None if the conversion failed.
+        """
+        sample = self._samples.get(json_file) if image_file else None
+        if self.manifest is not None and image_file:
+            output = self._outputs.get(json_file)
+            self.manifest.record(self._manifest_key(json_file), json_file, image_file,
+                                 sample[1] if sample is not None else None,
+                                 output[0] * self.shard_size + output[1] if output else None)
+        if sample is not None:
+            self.hash_cache.record(image_file, sample[1]["image_sha1"], sample[1]["image_signature"])
+        if self.output_layout == "sharded" and image_file:
+            self._indexed.append(json_file)
+
+    def _create_classes_file(self) -> None:
+        """
+        Creates a file containing the class names for mostly labelimg labeling tool in each task directory.
+        """
+        for task_target in self.targets.values():
+            classes_file_path = os.path.join(task_target, 'classes.txt')
+            with open(classes_file_path, 'w') as classes_file:
+                for class_name in self.class_names:
+                    classes_file.write(f"{class_name}\n")
+            logger.debug("Created: %s", classes_file_path)
+
+    def _read_tiff_and_json_files(self) -> List[Tuple[str, str]]:
+        """
+        Reads all image and corresponding JSON files below the source directory (at any depth).
+        
+        The files are indexed by their path without extension, so every JSON file is paired with the
+        image next to it that has the same name, and a missing file cannot shift the other pairs. The
+        JSON files without an image and the images without a JSON file are reported as orphans.
+        
+        Returns:
+            list: A list of tuples, each containing the path to an image file and its corresponding JSON file.
+        """
+        # The output may be inside the source directory, its images must not be paired again
+        exclude = os.path.abspath(os.path.dirname(self.error_log_path))
+        json_files, image_files, scan_errors = _scan_source_directory(self.path, self.image_extensions,
+                                                                      exclude, self.scan_workers)
+        for directory, error in scan_errors:
+            logger.warning("Directory could not be read: %s", directory)
+            self._log_error(None, f"Directory could not be read: {directory} ({error})", code="scan_error")
+        
+        # Index the images by their path without extension, the first extension in the list wins
+        priority = {extension: i for i, extension in enumerate(self.image_extensions)}
+        images: Dict[str, str] = {}
+        for image_file in image_files:
+            stem, extension = os.path.splitext(image_file)
+            current = images.get(stem)
+            if current is None or priority[extension.lower()] < priority[os.path.splitext(current)[1].lower()]:
+                images[stem] = image_file
+        
+        file_pairs = []
+        for json_path in sorted(json_files):
+            image_file = images.pop(os.path.splitext(json_path)[0], None)
+            if image_file is None:
+                logger.warning("Image not found for: %s", json_path)
+                self._log_error(json_path, "Orphan JSON file: no image with the same name", code="orphan_json")
+                self.stats["orphan_jsons"] += 1
+                continue
+            file_pairs.append((image_file, json_path))
+        
+        for image_file in sorted(images.values()):
+            logger.warning("JSON file not found for: %s", image_file)
+            self._log_error(image_file, "Orphan image: no JSON file with the same name", code="orphan_image")
+            self.stats["orphan_images"] += 1
+        
+        return file_pairs
+    
+    def _convert_json_to_yolo_format(self, pairs: List[Tuple[str, str]]) -> None:
+        """
+        Converts JSON label files to the YOLO label format of the current task(s).
+        
+        Args:
+            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+        """
+        os.makedirs(self.target, exist_ok=True)
+        
+        for tiff, json_file in pairs:
+            image_file = self._convert_file(json_file, self.stats)
+            self._record_converted(json_file, image_file)
+            self._report_progress()
+
+    def _build_shape_labels(self, json_file: str, data: Dict, task: str, stats: Dict[str, int],
+                            formatted: bool = True) -> Optional[list]:
+        """
+        Converts the shapes of a loaded JSON label file to the labels of a single task.
+        
+        Args:
+            json_file: The path to the JSON file (for error logging).
+            data: The content of the JSON file.
+            task: The task of the labels.
+            stats: The statistics dictionary of the task to be updated.
+            formatted: Whether to build the label lines or the class id and the normalized coordinates of
+                each label (for the compact dataset, see to_arrays).
+            
+        Returns:
+            list: The YOLO label lines (or class ids and coordinates), or None if the file does not produce any valid label.
+        """
+        image_size = self._image_size(json_file, data, stats)
+        if image_size is None:
+            return None
+        
+        polygon = task == "segmentation"
+        shapes = data.get('shapes', [])
+        if polygon:
+            shapes = self._simplify_shapes(json_file, shapes, stats)
+        normalized = self._normalize_shapes(shapes, *image_size, polygon=polygon, formatted=formatted)
+        shape_label = self._polygon_label if polygon else self._detection_label
+        yolo_labels = []
+        for shape_index, shape in enumerate(shapes):
+            yolo_label = shape_label(json_file, shape_index, shape, normalized[shape_index], stats, formatted=formatted)
+            if yolo_label is not None:
+                yolo_labels.append(yolo_label)
+
+        if not yolo_labels:
+            self._report_no_valid_label(json_file, task, stats)
+            return None
+        
+        return yolo_labels
+
+    def _detection_label(self, json_file: str, shape_index: int, shape: Dict,
+                         box: Union[None, Exception, Tuple[float, float, float, float]],
+                         stats: Dict[str, int], formatted: bool = True) -> Union[None, str, Tuple[int, tuple]]:
+        """
+        Converts a shape to a YOLO detection label.
+        
+        Args:
+            json_file: The path to the JSON file (for error logging).
+            shape_index: The index of the shape in the file.
+            shape: The shape.
+            box: The normalized bounding box of the shape (see _normalize_shapes).
+            stats: The statistics dictionary of the task to be updated.
+            formatted: Whether to return the label line or the class id and the box.
+            
+        Returns:
+            str: The YOLO label line (or the class id and the box), or None if the shape is invalid.
+        """
+        stats["processed_labels"] += 1
+        label = shape.get('label', '')
+        points = shape.get('points', [])
+        
+        if not label or not points:
+            self._log_error(json_file, f"Etiket veya nokta verisi yok: {shape}", code="missing_data", shape_index=shape_index)
+            stats["invalid_labels"] += 1
+            return None
+        
+        try:
+            if isinstance(box, Exception):
+                raise box
+            x_center, y_center, width, height = box
+            
+            # Check if the normalized coordinates are valid
+            if not (0 <= x_center <= 1 and 0 <= y_center <= 1 and 0 <= width <= 1 and 0 <= height <= 1):
+                error_msg = f"Normalized coordinates are invalid: {x_center}, {y_center}, {width}, {height}"
+                logger.warning(error_msg)
+                self._log_error(json_file, error_msg, code="invalid_coordinates", shape_index=shape_index)
+                stats["invalid_labels"] += 1
+                return None
+            
+            encoded_label = self.label_mapping.get(label, -1)
+            if encoded_label == -1:
+                logger.warning("Unknown label: %s", label)
+                self._log_error(json_file, f"Unknown label: {label}", code="unknown_label", shape_index=shape_index)
+                stats["invalid_labels"] += 1
+                return None
+                
+            if not formatted:
+                return encoded_label, box
+            # The values were checked above, the formatted label is valid by construction (see classify_label)
+            return f"{encoded_label} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
+            
+        except Exception as e:
+            error_msg = f"Label conversion error: {str(e)}"
+            logger.warning(error_msg)
+            self._log_error(json_file, error_msg, code="conversion_error", shape_index=shape_index)
+            stats["invalid_labels"] += 1
+            return None
+
+    def _image_size(self, json_file: str, data: Dict, stats: Dict) -> Optional[Tuple[float, float]]:
         """
-        The constructor of the JsonToYolo Class.
+        Returns the image dimensions of a loaded JSON label file, and reports the file as an error if they are invalid.
         
         Args:
-            path: The path to the source directory containing the files.
-            target: The path to the target directory where the converted files will be saved.
-            task: The task type ('detection' or 'segmentation').
+            json_file: The path to the JSON file (for error logging).
+            data: The content of the JSON file.
+            stats: The statistics dictionary to be updated.
+            
+        Returns:
+            tuple: The width and height of the image, or None if they are invalid.
         """
-        self.path = path 
-        self.target = os.path.join(target, task)
-        self.task = task
-        self.error_log_path = os.path.join(target, "label_errors.txt")
-        
-        # Define label mapping as a class attribute
-        self.label_mapping = {
-            'label1': 0,
-            'label2': 1,
-            'label3': 2,
-            'label4': 3
-        }
+        image_width = data.get('imageWidth', 0)
+        image_height = data.get('imageHeight', 0)
         
-        # Create target directory if it doesn't exist
-        os.makedirs(self.target, exist_ok=True) 
-        self._create_classes_file()
+        if image_width <= 0 or image_height <= 0:
+            error_msg = f"Invalid image dimensions: {image_width}x{image_height}"
+            logger.warning(error_msg)
+            self._log_error(json_file, error_msg, code="invalid_dimensions")
+            self._count_file(stats, "error_files")
+            return None
         
-        # Define statistics as a class attribute
-        self.stats = {
-            "processed_files": 0,
-            "successful_files": 0,
-            "error_files": 0,
-            "processed_labels": 0,
-            "invalid_labels": 0
-        }
+        return image_width, image_height
 
-    def _create_classes_file(self) -> None:
+    def _report_no_valid_label(self, json_file: str, task: str, stats: Dict[str, int]) -> None:
         """
-        Creates a file containing the class names for mostly labelimg labeling tool.
+        Reports a JSON label file that does not produce any valid label for a task.
+        
+        Args:
+            json_file: The path to the JSON file.
+            task: The task of the labels.
+            stats: The statistics dictionary of the task to be updated.
         """
-        classes_file_path = os.path.join(self.target, 'classes.txt')
-        with open(classes_file_path, 'w') as classes_file:
-            for class_name in self.label_mapping.keys():
-                classes_file.write(f"{class_name}\n")
-        print(f"Created: {classes_file_path}")
+        logger.warning("%s file does not contain a valid label", json_file)
+        if task == "detection":
+            self._log_error(json_file, "Label not found", code="no_valid_label")
+        else:
+            self._log_error(json_file, "Geçerli etiket bulunamadı", code="no_valid_label")
+        stats["error_files"] += 1
 
-    def _read_tiff_and_json_files(self) -> List[Tuple[str, str]]:
+                
+    def _write_label_file(self, json_file: str, yolo_labels: List[str], task: Optional[str] = None) -> str:
         """
-        Reads all TIFF and corresponding JSON files in the specified directory.
+        Writes out the converted labels of a JSON file to a text file.
         
+        Args:
+            json_file: The path to the JSON file.
+            yolo_labels: The YOLO label lines.
+            task: The task of the labels, None for the first task.
+            
         Returns:
-            list: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+            str: The path of the label file.
         """
-        tiff_files = sorted(glob(os.path.join(self.path, '*/*.tiff'), recursive=True))
-        json_files = sorted(glob(os.path.join(self.path, '*/*.json'), recursive=True))
+        yolo_txt_file = self._label_output_path(json_file, task)
+        with open(yolo_txt_file, 'w') as out_file:
+            out_file.write("\n".join(yolo_labels))
+        
+        logger.debug("Created: %s", yolo_txt_file)
+        return yolo_txt_file
 
-        if len(tiff_files) != len(json_files):
-            print(f"UYARI: TIFF ({len(tiff_files)}) ve JSON ({len(json_files)}) dosya sayıları eşleşmiyor!")
-            self._log_error(None, f"TIFF ({len(tiff_files)}) ve JSON ({len(json_files)}) dosya sayıları eşleşmiyor!")
+    def _write_converted(self, json_file: str, data: Dict, labels_by_task: Dict[str, List[str]],
+                         stats: Dict[str, int]) -> Optional[str]:
+        """
+        Writes the YOLO labels of a JSON file and places its image in the target directories.
         
-        file_pairs = []
-        for tiff, json_path in zip(tiff_files, json_files):
-            tiff_base = os.path.splitext(os.path.basename(tiff))[0]
-            json_base = os.path.splitext(os.path.basename(json_path))[0]
-            
-            # Check if the file names match with json's names
-            if tiff_base != json_base:
-                print(f"[WARNING]: File names do not match: {tiff} and {json_path}")
-                self._log_error(None, f"File names do not match: {tiff} and {json_path}")
+        Args:
+            json_file: The path to the JSON file.
+            data: The content of the JSON file.
+            labels_by_task: The YOLO label lines of each task that produced labels.
+            stats: The statistics dictionary to be updated.
             
-            file_pairs.append((tiff, json_path))
-        return file_pairs
-    
-    def _convert_json_to_yolo_detection_format(self, pairs: List[Tuple[str, str]]) -> None:
+        Returns:
+            str: The path of the source image copied for the file, or None if the image was not found.
         """
-        Converts JSON label files to YOLO detection label format.
+        if self.shard_writer is not None:
+            return self._write_sample(json_file, data, labels_by_task, stats)
         
-        Args:
-            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
+        for task, yolo_labels in labels_by_task.items():
+            self._write_label_file(json_file, yolo_labels, task)
+
+        # Copy the image file to the target directory
+        image_file = self._source_image(json_file, data)
+        
+        tasks = list(labels_by_task)
+        if image_file and os.path.exists(image_file):
+            digest = self._materialize_image(image_file, stats, tasks, json_file)
+            logger.debug("Moved image: %s to %s", image_file, self._output_directory(json_file, tasks[0]))
+            if digest is not None:
+                self._samples[json_file] = (image_file, self._sample_record(digest, labels_by_task))
+            self._count_file(stats, "successful_files", tasks)
+            return image_file
+        else:
+            error_msg = f"Image file not found: {image_file}"
+            logger.warning(error_msg)
+            self._log_error(json_file, error_msg, code="image_not_found")
+            self._count_file(stats, "error_files", tasks)
+        
+        return None
+
+    def _write_sample(self, json_file: str, data: Dict, labels_by_task: Dict[str, List[str]],
+                      stats: Dict[str, int]) -> Optional[str]:
         """
-        os.makedirs(self.target, exist_ok=True)
+        Writes the YOLO labels and the image of a JSON file as one sample of the tar shards. With several
+        tasks the label members are named {key}.{task}.txt.
         
-        for tiff, json_file in pairs:
-            self.stats["processed_files"] += 1
-            print(f"Processing: {json_file}")
+        Args:
+            json_file: The path to the JSON file.
+            data: The content of the JSON file.
+            labels_by_task: The YOLO label lines of each task that produced labels.
+            stats: The statistics dictionary to be updated.
             
-            try:
-                with open(json_file) as f:
-                    data = json.load(f)
+        Returns:
+            str: The path of the source image of the sample, or None if the image was not found.
+        """
+        tasks = list(labels_by_task)
+        image_file = self._source_image(json_file, data)
+        if not image_file or not os.path.exists(image_file):
+            error_msg = f"Image file not found: {image_file}"
+            logger.warning(error_msg)
+            self._log_error(json_file, error_msg, code="image_not_found")
+            self._count_file(stats, "error_files", tasks)
+            return None
+        
+        members: List[Tuple[str, Union[bytes, str]]] = [
+            (f"{task}.txt" if len(self.tasks) > 1 else "txt", "\n".join(yolo_labels).encode("utf-8"))
+            for task, yolo_labels in labels_by_task.items()]
+        if self.image_mode != "none":
+            members.append((os.path.splitext(image_file)[1].lstrip("."), image_file))
+        
+        stem = os.path.splitext(self._manifest_key(json_file))[0]
+        stats["image_bytes_copied"] += self.shard_writer.add(stem, self._outputs[json_file][2], members,
+                                                             os.path.getmtime(json_file))
+        logger.debug("Added sample: %s", stem)
+        self._count_file(stats, "successful_files", tasks)
+        return image_file
 
-                image_width = data.get('imageWidth', 0)
-                image_height = data.get('imageHeight', 0)
-                
-                if image_width <= 0 or image_height <= 0:
-                    error_msg = f"Invalid image dimensions: {image_width}x{image_height}"
-                    print(f"[WARNING]: {error_msg}")
-                    self._log_error(json_file, error_msg)
-                    self.stats["error_files"] += 1
-                    continue
-                
-                yolo_labels = []
+    @staticmethod
+    def _source_image(json_file: str, data: Dict) -> str:
+        """
+        Returns the path of the image referenced by a JSON label file ('' if it has no imagePath).
+        
+        Args:
+            json_file: The path to the JSON file.
+            data: The content of the JSON file.
+        """
+        image_path = data.get('imagePath', '')
+        return os.path.join(os.path.dirname(json_file), image_path) if image_path else ''
 
-                for shape in data.get('shapes', []):
-                    self.stats["processed_labels"] += 1
-                    label = shape.get('label', '')
-                    points = shape.get('points', [])
-                    
-                    if not label or not points:
-                        self._log_error(json_file, f"Etiket veya nokta verisi yok: {shape}")
-                        self.stats["invalid_labels"] += 1
-                        continue
-                    
-                    try:
-                        x_coords = [point[0] for point in points]
-                        y_coords = [point[1] for point in points]
-                        
-                        x_center = sum(x_coords) / len(x_coords)
-                        y_center = sum(y_coords) / len(y_coords)
-                        
-                        x_center /= image_width
-                        y_center /= image_height
-                        width = (max(x_coords) - min(x_coords)) / image_width
-                        height = (max(y_coords) - min(y_coords)) / image_height
-                        
-                        # Check if the normalized coordinates are valid
-                        if not (0 <= x_center <= 1 and 0 <= y_center <= 1 and 0 <= width <= 1 and 0 <= height <= 1):
-                            error_msg = f"Normalized coordinates are invalid: {x_center}, {y_center}, {width}, {height}"
-                            print(f"[WARNING]: {error_msg}")
-                            self._log_error(json_file, error_msg)
-                            self.stats["invalid_labels"] += 1
-                            continue
-                        
-                        encoded_label = self.label_mapping.get(label, -1)
-                        if encoded_label == -1:
-                            print(f"[WARNING]: Unknown label: {label}")
-                            self._log_error(json_file, f"Unknown label: {label}")
-                            self.stats["invalid_labels"] += 1
-                            continue
-                            
-                        yolo_label = f"{encoded_label} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
-                        
-                        # Check if the label is in the correct format
-                        if self._is_bbox_or_polygon(yolo_label, json_file) != "Detection (BBox)":
-                            error_msg = f"The label is not in the correct format: {yolo_label}"
-                            print(f"[WARNING]: {error_msg}")
-                            self._log_error(json_file, error_msg)
-                            self.stats["invalid_labels"] += 1
-                            continue
-                            
-                        yolo_labels.append(yolo_label)
-                        
-                    except Exception as e:
-                        error_msg = f"Label conversion error: {str(e)}"
-                        print(f"[WARNING]: {error_msg}")
-                        self._log_error(json_file, error_msg)
-                        self.stats["invalid_labels"] += 1
-                        continue
+    def _build_tasks_labels(self, json_file: str, data: Dict, stats: Dict) -> Optional[Dict[str, List[str]]]:
+        """
+        Converts the shapes of a loaded JSON label file to the labels of all the tasks. The shapes are
+        normalized once per task and each shape is converted for every task in the same pass.
+        
+        Args:
+            json_file: The path to the JSON file (for error logging).
+            data: The content of the JSON file.
+            stats: The statistics dictionary to be updated.
+            
+        Returns:
+            Dict: The YOLO label lines of each task that produced labels, or None if no task did.
+        """
+        image_size = self._image_size(json_file, data, stats)
+        if image_size is None:
+            return None
+        
+        shapes = data.get('shapes', [])
+        converters = {
+            "detection": (self._detection_label, False),
+            "segmentation": (self._polygon_label, True)
+        }
+        # The bounding boxes are computed from the original points
+        task_shapes = {task: self._simplify_shapes(json_file, shapes, stats) if converters[task][1] else shapes
+                       for task in self.tasks}
+        normalized = {task: self._normalize_shapes(task_shapes[task], *image_size, polygon=converters[task][1])
+                      for task in self.tasks}
+        labels_by_task: Dict[str, List[str]] = {task: [] for task in self.tasks}
+        
+        for shape_index in range(len(shapes)):
+            stats["processed_labels"] += 1
+            invalid = False
+            for task in self.tasks:
+                yolo_label = converters[task][0](json_file, shape_index, task_shapes[task][shape_index],
+                                                 normalized[task][shape_index], stats["tasks"][task])
+                if yolo_label is None:
+                    invalid = True
+                else:
+                    labels_by_task[task].append(yolo_label)
+            if invalid:
+                stats["invalid_labels"] += 1
+        
+        for task in self.tasks:
+            if not labels_by_task[task]:
+                self._report_no_valid_label(json_file, task, stats["tasks"][task])
+                del labels_by_task[task]
+        
+        if not labels_by_task:
+            stats["error_files"] += 1
+            return None
+        
+        return labels_by_task
 
-                if not yolo_labels:
-                    print(f"[WARNING]: {json_file} file does not contain a valid label")
-                    self._log_error(json_file, "Label not found")
-                    self.stats["error_files"] += 1
-                    continue
-                
-                # Write out the converted labels to a text file
-                yolo_txt_file = os.path.join(self.target, os.path.basename(json_file).replace('.json', '.txt'))
-                with open(yolo_txt_file, 'w') as out_file:
-                    out_file.write("\n".join(yolo_labels))
-                
-                print(f"Created: {yolo_txt_file}") 
+    def _convert_file(self, json_file: str, stats: Dict) -> Optional[str]:
+        """
+        Converts a single JSON label file to the label formats of the current task(s). The file is loaded
+        once and its image is stored once.
+        
+        Args:
+            json_file: The path to the JSON file.
+            stats: The statistics dictionary to be updated.
+            
+        Returns:
+            str: The path of the source image copied for the file, or None if the conversion failed.
+        """
+        self._count_file(stats, "processed_files")
+        logger.debug("Processing: %s", json_file)
+        
+        try:
+            data = self._load_json(json_file)
+            labels_by_task = self._build_labels(json_file, data, stats)
+            if labels_by_task is None:
+                return None
+            return self._write_converted(json_file, data, labels_by_task, stats)
+        except Exception as e:
+            error_msg = f"File processing error: {str(e)}"
+            logger.error(error_msg)
+            self._log_error(json_file, error_msg, code="file_error")
+            self._count_file(stats, "error_files")
+        
+        return None
 
-                # Copy the image file to the target directory
-                image_path = data.get('imagePath', '')
-                image_file = os.path.join(os.path.dirname(json_file), image_path) if image_path else ''
-                
-                if image_file and os.path.exists(image_file):
-                    shutil.copy(image_file, self.target)
-                    print(f"Moved image: {image_file} to {self.target}") 
-                    self.stats["successful_files"] += 1
-                else:
-                    error_msg = f"Image file not found: {image_file}"
-                    print(f"WARNING: {error_msg}")
-                    self._log_error(json_file, error_msg)
-                    self.stats["error_files"] += 1
-                    
-            except Exception as e:
-                error_msg = f"File processing error: {str(e)}"
-                print(f"[ERROR]: {error_msg}")
-                self._log_error(json_file, error_msg)
-                self.stats["error_files"] += 1
-                
-    def _convert_json_to_yolo_polygon_format(self, pairs: List[Tuple[str, str]]) -> None:
+    def _process_parallel(self, pairs: List[Tuple[str, str]]) -> None:
         """
-        Converts JSON label files to YOLO polygon label format.
+        Converts the JSON label files with a pool of worker processes.
+        
+        The pairs are distributed in chunks and the results are collected in input order, so the
+        merged statistics and the error log are the same as the ones produced by the serial path.
         
         Args:
             pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
         """
         os.makedirs(self.target, exist_ok=True)
+        chunksize = max(1, len(pairs) // (self.workers * 4))
         
-        for tiff, json_file in pairs:
-            self.stats["processed_files"] += 1
-            print(f"Processing: {json_file}")
-            
-            try:
-                with open(json_file) as f:
-                    data = json.load(f)
-
-                image_width = data.get('imageWidth', 0)
-                image_height = data.get('imageHeight', 0)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self,)) as executor:
+            results = executor.map(_convert_pair_in_worker, pairs, chunksize=chunksize)
+            for (tiff, json_file), (file_stats, error_records, image_file, timings, sample) in zip(pairs, results):
+                _merge_stats(self.stats, file_stats)
+                if sample is not None:
+                    self._samples[json_file] = sample
                 
-                if image_width <= 0 or image_height <= 0:
-                    error_msg = f"Invalid image dimensions: {image_width}x{image_height}"
-                    print(f"[WARNING]: {error_msg}")
-                    self._log_error(json_file, error_msg)
-                    self.stats["error_files"] += 1
-                    continue
-                    
-                yolo_labels = []
+                if timings is not None:
+                    self.timings.merge(timings)
+                
+                self.error_log.extend(error_records)
+                
+                self._record_converted(json_file, image_file)
+                self._report_progress()
 
-                for shape in data.get('shapes', []):
-                    self.stats["processed_labels"] += 1
-                    label = shape.get('label', '')
-                    points = shape.get('points', [])
-                    
-                    if not label or not points:
-                        self._log_error(json_file, f"Label or point data is missing: {shape}")
-                        self.stats["invalid_labels"] += 1
-                        continue
-                    
-                    # The polygon must have at least 3 points
-                    if len(points) < 3:
-                        error_msg = f"Polygon has too few points: {len(points)}"
-                        print(f"[WARNING]: {error_msg}")
-                        self._log_error(json_file, error_msg)
-                        self.stats["invalid_labels"] += 1
-                        continue
-                    
-                    try:
-                        normalized_points = []
-                        invalid_coords = False
-                        
-                        for point in points:
-                            x_normalized = point[0] / image_width
-                            y_normalized = point[1] / image_height
-                            
-                            # Check if the normalized coordinates are valid
-                            if not (0 <= x_normalized <= 1 and 0 <= y_normalized <= 1):
-                                error_msg = f"Normalized coordinate is invalid: ({x_normalized}, {y_normalized})"
-                                print(f"[WARNING]: {error_msg}")
-                                self._log_error(json_file, error_msg)
-                                invalid_coords = True
-                                break
-                                
-                            normalized_points.append(f"{x_normalized:.6f} {y_normalized:.6f}")
-
-                        if invalid_coords:
-                            self.stats["invalid_labels"] += 1
-                            continue
-                            
-                        encoded_label = self.label_mapping.get(label, -1) 
-                        if encoded_label == -1:
-                            print(f"[WARNING]: Unknown label: {label}")
-                            self._log_error(json_file, f"Unknown label: {label}")
-                            self.stats["invalid_labels"] += 1
-                            continue
-                            
-                        yolo_label = f"{encoded_label} {' '.join(normalized_points)}"
-                        
-                        # Check if the label is in the correct format
-                        if self._is_bbox_or_polygon(yolo_label, json_file) != "Segmentation (Polygon)":
-                            error_msg = f"The label is not in the correct format: {yolo_label}"
-                            print(f"[WARNING]: {error_msg}")
-                            self._log_error(json_file, error_msg)
-                            self.stats["invalid_labels"] += 1
-                            continue
-                            
-                        yolo_labels.append(yolo_label)
-                        
-                    except Exception as e:
-                        error_msg = f"Label conversion error: {str(e)}"
-                        print(f"HATA: {error_msg}")
-                        self._log_error(json_file, error_msg)
-                        self.stats["invalid_labels"] += 1
-                        continue
+    def _build_labels(self, json_file: str, data: Dict, stats: Dict[str, int]) -> Optional[Dict[str, List[str]]]:
+        """
+        Converts the shapes of a loaded JSON label file to the labels of the current task(s).
+        
+        Args:
+            json_file: The path to the JSON file (for error logging).
+            data: The content of the JSON file.
+            stats: The statistics dictionary to be updated.
+            
+        Returns:
+            Dict: The YOLO label lines of each task, or None if the file does not produce any valid label.
+        """
+        if len(self.tasks) > 1:
+            return self._build_tasks_labels(json_file, data, stats)
+        
+        yolo_labels = self._build_shape_labels(json_file, data, self.task, stats)
+        return {self.task: yolo_labels} if yolo_labels is not None else None
 
-                if not yolo_labels:
-                    print(f"[WARNING]: {json_file} file does not contain a valid label")
-                    self._log_error(json_file, "Geçerli etiket bulunamadı")
-                    self.stats["error_files"] += 1
-                    continue
-                    
-                # Write out the converted labels to a text file
-                yolo_txt_file = os.path.join(self.target, os.path.basename(json_file).replace('.json', '.txt'))
-                with open(yolo_txt_file, 'w') as out_file:
-                    out_file.write("\n".join(yolo_labels))
-                
-                print(f"Created: {yolo_txt_file}")
+    def _read_stage(self, json_file: str) -> Tuple[Optional[Dict], Optional[Exception], float]:
+        """
+        Loads a JSON file in a reader thread of the pipeline.
+        
+        Args:
+            json_file: The path to the JSON file.
+            
+        Returns:
+            tuple: The content of the file (or the error raised while loading it) and the time spent.
+        """
+        start = time.perf_counter()
+        try:
+            return self._load_json(json_file), None, time.perf_counter() - start
+        except Exception as e:
+            return None, e, time.perf_counter() - start
 
-                # Copy the image file to the target directory
-                image_path = data.get('imagePath', '')
-                image_file = os.path.join(os.path.dirname(json_file), image_path) if image_path else ''
-                
-                if image_file and os.path.exists(image_file):
-                    shutil.copy(image_file, self.target)
-                    print(f"Moved image: {image_file} to {self.target}")
-                    self.stats["successful_files"] += 1
-                else:
-                    error_msg = f"Image file not found: {image_file}"
-                    print(f"WARNING: {error_msg}")
-                    self._log_error(json_file, error_msg)
-                    self.stats["error_files"] += 1
-                    
-            except Exception as e:
-                error_msg = f"File processing error: {str(e)}"
-                print(f"[ERROR]: {error_msg}")
-                self._log_error(json_file, error_msg)
-                self.stats["error_files"] += 1
+    def _write_stage(self, json_file: str, data: Dict, labels_by_task: Dict[str, List[str]],
+                     stats: Dict[str, int]) -> Tuple[Optional[str], list, float]:
+        """
+        Writes the outputs of a converted file in a writer thread of the pipeline. The errors are collected
+        in a thread-local log and returned, so that they are written in input order.
+        
+        Args:
+            json_file: The path to the JSON file.
+            data: The content of the JSON file.
+            labels_by_task: The YOLO label lines of each task.
+            stats: The statistics dictionary of the file.
+            
+        Returns:
+            tuple: The path of the copied source image (None on failure), the error records and the time spent.
+        """
+        start = time.perf_counter()
+        _THREAD_STATE.error_log = ErrorLog(None)
+        try:
+            image_file = self._write_converted(json_file, data, labels_by_task, stats)
+        except Exception as e:
+            error_msg = f"File processing error: {str(e)}"
+            logger.error(error_msg)
+            self._log_error(json_file, error_msg, code="file_error")
+            self._count_file(stats, "error_files")
+            image_file = None
+        finally:
+            records = _THREAD_STATE.error_log.drain()
+            _THREAD_STATE.error_log = None
+        return image_file, records, time.perf_counter() - start
 
-    def _get_label_from_mapping(self, encoded_label: int) -> str:
+    def _process_pipelined(self, pairs: List[Tuple[str, str]]) -> None:
         """
-        Maps the encoded label to its corresponding text label.
+        Converts the JSON label files with overlapping stages: a pool of threads reads the JSON files ahead
+        of the conversion and another one writes the labels and the images behind it. Both sides are bounded
+        queues, the conversion waits when the reads fall behind or when the write queue is full.
+        
+        The statistics of the stages are stored in stats["pipeline"]: the files and the busy time of each
+        stage, its throughput, the number of times the conversion waited for a read (read_starved) and
+        for a free slot in the write queue (write_backpressure).
+        
+        In the tar layout the samples are appended by a single writer thread, in input order, so the shards
+        have the same content as in a serial run.
         
         Args:
-            encoded_label: The encoded label.
+            pairs: A list of tuples, each containing the path to a TIFF file and its corresponding JSON file.
         """
-        return {v: k for k, v in self.label_mapping.items()}.get(encoded_label, "unknown") 
-    
-    def _is_bbox_or_polygon(self, label: str, filename: Optional[str] = None) -> Optional[str]:
+        os.makedirs(self.target, exist_ok=True)
+        write_threads = 1 if self.shard_writer is not None else self.io_threads
+        stages = {stage: {"files": 0, "busy_s": 0.0} for stage in ("read", "convert", "write")}
+        counters = {"read_starved": 0, "write_backpressure": 0}
+        started = time.perf_counter()
+        remaining = iter(pairs)
+        reads = deque()
+        writes = deque()
+        
+        def finish_write() -> None:
+            json_file, file_stats, convert_records, future, file_seconds = writes.popleft()
+            image_file, records, elapsed = None, [], 0.0
+            if future is not None:
+                image_file, records, elapsed = future.result()
+                stages["write"]["files"] += 1
+                stages["write"]["busy_s"] += elapsed
+            if self.timings is not None:
+                self.timings.add_file(json_file, file_seconds + elapsed)
+            # The errors of a file are logged after the ones of the files before it, as in a serial run
+            self.error_log.extend(convert_records)
+            self.error_log.extend(records)
+            _merge_stats(self.stats, file_stats)
+            self._record_converted(json_file, image_file)
+            self._report_progress()
+        
+        with ThreadPoolExecutor(max_workers=self.io_threads) as read_pool, \
+                ThreadPoolExecutor(max_workers=write_threads) as write_pool:
+            while True:
+                while len(reads) < self.read_queue_depth:
+                    pair = next(remaining, None)
+                    if pair is None:
+                        break
+                    reads.append((pair[1], read_pool.submit(self._read_stage, pair[1])))
+                if not reads:
+                    break
+                
+                json_file, future = reads.popleft()
+                if not future.done():
+                    counters["read_starved"] += 1
+                data, error, elapsed = future.result()
+                stages["read"]["files"] += 1
+                stages["read"]["busy_s"] += elapsed
+                
+                start = time.perf_counter()
+                file_stats = self._empty_stats(self.tasks)
+                self._count_file(file_stats, "processed_files")
+                logger.debug("Processing: %s", json_file)
+                labels_by_task = None
+                _THREAD_STATE.error_log = ErrorLog(None)
+                try:
+                    if error is not None:
+                        raise error
+                    labels_by_task = self._build_labels(json_file, data, file_stats)
+                except Exception as e:
+                    error_msg = f"File processing error: {str(e)}"
+                    logger.error(error_msg)
+                    self._log_error(json_file, error_msg, code="file_error")
+                    self._count_file(file_stats, "error_files")
+                finally:
+                    convert_records = _THREAD_STATE.error_log.drain()
+                    _THREAD_STATE.error_log = None
+                convert_elapsed = time.perf_counter() - start
+                stages["convert"]["files"] += 1
+                stages["convert"]["busy_s"] += convert_elapsed
+                
+                # The files without labels also wait for the writes of the files before them
+                future = None
+                if labels_by_task is not None:
+                    while len(writes) >= self.write_queue_depth:
+                        if writes[0][3] is not None and not writes[0][3].done():
+                            counters["write_backpressure"] += 1
+                        finish_write()
+                    future = write_pool.submit(self._write_stage, json_file, data, labels_by_task, file_stats)
+                writes.append((json_file, file_stats, convert_records, future, elapsed + convert_elapsed))
+            
+            while writes:
+                finish_write()
+        
+        for stage in stages.values():
+            stage["files_per_s"] = stage["files"] / stage["busy_s"] if stage["busy_s"] > 0 else 0.0
+        self.stats["pipeline"] = {**stages, **counters, "wall_s": time.perf_counter() - started}
+
+    def _polygon_label(self, json_file: str, shape_index: int, shape: Dict,
+                       polygon: Union[None, Exception, Tuple[Union[None, str, List[float]], Optional[Tuple[float, float]]]],
+                       stats: Dict[str, int], formatted: bool = True) -> Union[None, str, Tuple[int, List[float]]]:
         """
-        Checks if the label belongs to the bounding box or polygon format.
+        Converts a shape to a YOLO polygon label.
         
         Args:
-            label: The label line in YOLO format.
-            filename: The file that the label belongs to (for error logging).
+            json_file: The path to the JSON file (for error logging).
+            shape_index: The index of the shape in the file.
+            shape: The shape.
+            polygon: The normalized polygon of the shape (see _normalize_shapes).
+            stats: The statistics dictionary of the task to be updated.
+            formatted: Whether to return the label line or the class id and the normalized values (the
+                polygon must then hold the values, see _normalize_shapes).
             
         Returns:
-            str: "Detection (BBox)" or "Segmentation (Polygon)" or None (invalid label)
+            str: The YOLO label line (or the class id and the values), or None if the shape is invalid.
         """
-        # Check if the label is empty or invalid
-        if not label or not label.strip():
-            self._log_error(self.error_log_path, filename, "Empty label")
+        stats["processed_labels"] += 1
+        label = shape.get('label', '')
+        points = shape.get('points', [])
+        
+        if not label or not points:
+            self._log_error(json_file, f"Label or point data is missing: {shape}", code="missing_data", shape_index=shape_index)
+            stats["invalid_labels"] += 1
+            return None
+        
+        # The polygon must have at least 3 points
+        if len(points) < 3:
+            error_msg = f"Polygon has too few points: {len(points)}"
+            logger.warning(error_msg)
+            self._log_error(json_file, error_msg, code="too_few_points", shape_index=shape_index)
+            stats["invalid_labels"] += 1
             return None
         
         try:
-            data = list(map(float, label.split()))
-            
-            # At least one class ID is required
-            if len(data) < 2:
-                self._log_error(self.error_log_path, filename, "Insufficient data: At least one class ID and one coordinate is required")
+            if isinstance(polygon, Exception):
+                raise polygon
+            coords, invalid_point = polygon
+
+            if invalid_point is not None:
+                error_msg = f"Normalized coordinate is invalid: ({invalid_point[0]}, {invalid_point[1]})"
+                logger.warning(error_msg)
+                self._log_error(json_file, error_msg, code="invalid_coordinates", shape_index=shape_index)
+                stats["invalid_labels"] += 1
                 return None
-            
-            # The first value is the class ID, the rest are the coordinates
-            class_id = int(data[0])  # The class ID should be an integer
-            values = data[1:]
-            
-            # The YOLO bbox label format is checked: exactly 4 values (x, y, w, h)
-            if len(values) == 4:
-                # Check if the values are within the range of 0 to 1
-                if all(0 <= val <= 1 for val in values):
-                    return "Detection (BBox)"
-                elif all(val >= 0 for val in values):
-                    return "Detection (BBox)"
-                else:
-                    self._log_error(self.error_log_path, filename, "Bbox coordinates are out of range")
-                    return None
-            
-            # Check if the coordinates are in YOLO polygon format : at least 6 values (3 points) and an even number of them
-            elif len(values) >= 6 and len(values) % 2 == 0:
-                invalid_coords = []
-                for i in range(0, len(values), 2):
-                    x, y = values[i], values[i+1]
-                    if not (0 <= x <= 1 and 0 <= y <= 1):
-                        if x < 0 or y < 0:
-                            invalid_coords.append(f"({x},{y})")
                 
-                if invalid_coords:
-                    self._log_error(self.error_log_path, filename, f"Invalid polygon coordinates: {', '.join(invalid_coords)}")
-                    return None
-                return "Segmentation (Polygon)"
-            
-            else:
-                self._log_error(self.error_log_path, filename, f"Unsupported coordinate number: {len(values)}")
+            encoded_label = self.label_mapping.get(label, -1) 
+            if encoded_label == -1:
+                logger.warning("Unknown label: %s", label)
+                self._log_error(json_file, f"Unknown label: {label}", code="unknown_label", shape_index=shape_index)
+                stats["invalid_labels"] += 1
                 return None
+                
+            if not formatted:
+                return encoded_label, coords
+            # At least 3 points, all of them checked above: the formatted label is valid by construction
+            return f"{encoded_label} {coords}"
             
         except Exception as e:
-            self._log_error(self.error_log_path, filename, f"Process Error: {str(e)}")
+            error_msg = f"Label conversion error: {str(e)}"
+            logger.error(error_msg)
+            self._log_error(json_file, error_msg, code="conversion_error", shape_index=shape_index)
+            stats["invalid_labels"] += 1
             return None
+
+
+    def _get_label_from_mapping(self, encoded_label: int) -> str:
+        """
+        Maps the encoded label to its corresponding text label.
+        
+        Args:
+            encoded_label: The encoded label.
+        """
+        if 0 <= encoded_label < len(self.class_names):
+            return self.class_names[encoded_label]
+        return "unknown"
     
-    def _log_error(self, filename: Optional[str], error_message: str) -> None:
+    def _log_error(self, filename: Optional[str], error_message: str, code: str = "error",
+                   shape_index: Optional[int] = None) -> None:
         """
-        Writes error messages to the error log file.
+        Writes error messages to the error log.
         
         Args:
             filename: The name of the file that caused the error.
             error_message: The error message.
+            code: A short machine-readable error code.
+            shape_index: The index of the shape that caused the error, if any.
         """
-        with open(self.error_log_path, "a", encoding="utf-8") as f:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            file_info = f"File: {filename}" if filename else "Unknown file"
-            f.write(f"[{timestamp}] {file_info} - {error_message}\n")
+        error_log = getattr(_THREAD_STATE, "error_log", None)
+        if error_log is None:
+            error_log = self.error_log
+        error_log.write(filename, error_message, code, shape_index)
     
-    def process(self) -> Dict[str, int]:
+    def to_arrays(self, task: Optional[str] = None) -> LabelArrays:
+        """
+        Converts all JSON label files to a compact in-memory dataset instead of label files. Nothing is
+        written to the target directory except the error log.
+        
+        Args:
+            task: The task of the labels, None for the first task.
+            
+        Returns:
+            LabelArrays: The converted dataset, the statistics are added to self.stats.
+        """
+        if np is None:
+            raise ImportError("to_arrays requires NumPy to be installed")
+        task = task or self.task
+        if task not in self.tasks:
+            raise ValueError(f"Unsupported task: {task}")
+        
+        stats = self._empty_stats()
+        files: List[str] = []
+        images: List[str] = []
+        file_offsets = array("q", [0])
+        class_ids = array("i")
+        label_offsets = array("q", [0])
+        coords = array("f")
+        try:
+            pairs = self._read_tiff_and_json_files()
+            if self.scan_labels:
+                self._scan_vocabulary(pairs)
+            for tiff, json_file in pairs:
+                stats["processed_files"] += 1
+                logger.debug("Processing: %s", json_file)
+                try:
+                    data = self._load_json(json_file)
+                    label_values = self._build_shape_labels(json_file, data, task, stats, formatted=False)
+                    if label_values is None:
+                        continue
+                    
+                    image_file = self._source_image(json_file, data)
+                    if not image_file or not os.path.exists(image_file):
+                        error_msg = f"Image file not found: {image_file}"
+                        logger.warning(error_msg)
+                        self._log_error(json_file, error_msg, code="image_not_found")
+                        stats["error_files"] += 1
+                        continue
+                except Exception as e:
+                    error_msg = f"File processing error: {str(e)}"
+                    logger.error(error_msg)
+                    self._log_error(json_file, error_msg, code="file_error")
+                    stats["error_files"] += 1
+                    continue
+                
+                for class_id, values in label_values:
+                    class_ids.append(class_id)
+                    coords.extend(values)
+                    label_offsets.append(len(coords))
+                file_offsets.append(len(class_ids))
+                files.append(self._manifest_key(json_file))
+                images.append(image_file)
+                stats["successful_files"] += 1
+        finally:
+            self.error_log.close()
+            _merge_stats(self.stats, stats)
+        
+        return LabelArrays(task, list(self.class_names), files, images,
+                           np.frombuffer(file_offsets, dtype=np.int64), np.frombuffer(class_ids, dtype=np.int32),
+                           np.frombuffer(label_offsets, dtype=np.int64), np.frombuffer(coords, dtype=np.float32))
+
+    def process(self) -> Dict[str, Union[int, str]]:
         """
         Converts all JSON label files to the specified task format.
         
         Returns:
             Dict: The statistics of the conversion process.
         """
-        print(f"[Started at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
-        print(f"JSON files converted to YOLO {self.task} format...")
-        files = self._read_tiff_and_json_files()
+        logger.info(f"[Started at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
+        logger.info(f"JSON files converted to YOLO {' and '.join(self.tasks)} format...")
         
-        if self.task == "detection":
-            self._convert_json_to_yolo_detection_format(files)
-        elif self.task == "segmentation":
-            self._convert_json_to_yolo_polygon_format(files)
+        profiler = None
+        if self.profile_path:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
         
-        print("\nConversion Complete!")
-        print(f"Number of processed files: {self.stats['processed_files']}")
-        print(f"Number of successful files: {self.stats['successful_files']}")
-        print(f"Number of error files: {self.stats['error_files']}")
-        print(f"Number of processed labels: {self.stats['processed_labels']}")
-        print(f"Number of invalid labels: {self.stats['invalid_labels']}")  
-        print(f"Detailed error report: {self.error_log_path}")
+        try:
+            pairs = self._read_tiff_and_json_files()
+            if self.scan_labels:
+                self._scan_vocabulary(pairs)
+            self._assign_outputs(pairs)
+            files = self._filter_unchanged(pairs)
+            if self.progress:
+                self.progress_reporter = ProgressReporter(len(files), summary_interval=self.summary_interval)
+            if self.pipeline:
+                self._process_pipelined(files)
+            elif self.workers > 1 and len(files) > 1:
+                self._process_parallel(files)
+            else:
+                self._convert_json_to_yolo_format(files)
+            if self.split is not None:
+                self._split_dataset()
+        finally:
+            if self.progress_reporter is not None:
+                self.progress_reporter.finish()
+                self.progress_reporter = None
+            if profiler is not None:
+                profiler.disable()
+            self._write_index()
+            self.error_log.close()
+            if self.manifest is not None:
+                self.manifest.close()
+            if self.hash_cache is not None:
+                self.hash_cache.close()
+        
+        self.stats["image_mode"] = self.image_mode
+        if self.stats["simplified_files"]:
+            self.stats["max_simplification_error"] = max(entry[3] for entry in self.stats["simplified_files"])
+        if self.timings is not None:
+            self.stats["timings"] = self.timings.summary()
+        if profiler is not None:
+            profiler.dump_stats(self.profile_path)
+            self.stats["profile"] = _profile_summary(profiler)
+        if self.timings_path:
+            with open(self.timings_path, "w") as f:
+                json.dump({key: self.stats[key] for key in ("timings", "profile") if key in self.stats}, f, indent=2)
+        
+        logger.info("Conversion Complete!")
+        logger.info(f"Number of processed files: {self.stats['processed_files']}")
+        logger.info(f"Number of successful files: {self.stats['successful_files']}")
+        logger.info(f"Number of error files: {self.stats['error_files']}")
+        logger.info(f"Number of processed labels: {self.stats['processed_labels']}")
+        logger.info(f"Number of invalid labels: {self.stats['invalid_labels']}")  
+        logger.info(f"Number of orphan JSON files / images: {self.stats['orphan_jsons']} / {self.stats['orphan_images']}")
+        for task, task_stats in self.stats.get("tasks", {}).items():
+            logger.info(f"Task {task}: {task_stats['successful_files']} successful files, {task_stats['error_files']} error files, "
+                  f"{task_stats['invalid_labels']} invalid labels")
+        if "pipeline" in self.stats:
+            pipeline = self.stats["pipeline"]
+            for stage in ("read", "convert", "write"):
+                logger.info(f"Pipeline {stage} stage: {pipeline[stage]['files']} files, "
+                      f"{pipeline[stage]['busy_s']:.2f}s busy ({pipeline[stage]['files_per_s']:.1f} files/s)")
+            logger.info(f"Pipeline waits: {pipeline['read_starved']} read starved, "
+                  f"{pipeline['write_backpressure']} write backpressure")
+        if self.stats["vertices_in"]:
+            logger.info(f"Simplified polygons: {self.stats['vertices_in']} -> {self.stats['vertices_out']} vertices "
+                        f"({(1 - self.stats['vertices_out'] / self.stats['vertices_in']) * 100:.1f}% fewer) in "
+                        f"{len(self.stats['simplified_files'])} files, max error "
+                        f"{self.stats['max_simplification_error']:.3f}px")
+        logger.info(f"Image mode: {self.image_mode} ({self.stats['image_bytes_copied']} bytes copied)")
+        if self.output_layout != "flat":
+            logger.info(f"Output layout: {self.output_layout} ({self.shard_size} files per shard), "
+                        f"index: {os.path.join(self.target, 'index.jsonl')}")
+        elif self.stats["name_collisions"]:
+            logger.info(f"Number of output name collisions: {self.stats['name_collisions']} (use --output-layout sharded)")
+        if "split" in self.stats:
+            logger.info("Split: " + ", ".join(f"{name} {count}" for name, count in self.stats["split"].items()) +
+                        f" files ({self.stats['duplicate_files']} duplicates dropped, "
+                        f"{self.stats['conflicting_duplicates']} images with conflicting labels), "
+                        f"data.yaml: {os.path.join(self.target, 'data.yaml')}")
+            logger.info(f"Hashed images: {self.stats['hashed_images']} ({self.stats['hash_cache_hits']} from the cache)")
+        if "timings" in self.stats:
+            timings = self.stats["timings"]
+            for phase, summary in timings["phases"].items():
+                if summary["count"]:
+                    logger.info(f"Phase {phase}: {summary['total_s']:.3f}s over {summary['count']} calls "
+                          f"(p50 {summary['p50_ms']:.3f}ms, p99 {summary['p99_ms']:.3f}ms)")
+            for entry in timings["slowest_files"][:5]:
+                logger.info(f"Slow file: {entry['file']} ({entry['seconds'] * 1000:.1f}ms)")
+        if self.profile_path:
+            logger.info(f"Profile: {self.profile_path}")
+        if self.manifest is not None:
+            logger.info(f"Number of skipped (unchanged) files: {self.stats['skipped_files']}")
+        logger.info(f"Detailed error report: {self.error_log_path} ({self.error_log.count} errors)")
         
         return self.stats
 
@@ -439,27 +3480,196 @@ def main():
     parser = argparse.ArgumentParser(description="Converts JSON label files to the specified task format")
     parser.add_argument("--path",
                         type=str,
-                        help="The path to the source directory containing the files.",
-                        required=True)
+                        help="The path to the source directory containing the files (required unless --verify).")
     
     parser.add_argument("--target",
                         type=str,
-                        help="The path to the target directory where the converted files will be saved.",
-                        required=True)
+                        help="The path to the target directory where the converted files will be saved (required unless --verify).")
     
     parser.add_argument("--task",
                         type=str,
+                        nargs="+",
                         choices=["segmentation", "detection"],
-                        help="The task type: detection or segmentation.",
-                        required=True)
+                        help="The task type: detection or segmentation, or both to convert each file once for both (required unless --verify).")
+    
+    parser.add_argument("--verify",
+                        type=str,
+                        help="Validate the YOLO label files of this directory instead of converting (uses --workers processes).")
+    
+    parser.add_argument("--workers",
+                        type=int,
+                        default=1,
+                        help="The number of worker processes used for the conversion.")
+    
+    parser.add_argument("--incremental",
+                        action="store_true",
+                        help="Skip the pairs that have not changed since the previous run (uses a manifest in the target directory).")
+    
+    parser.add_argument("--image-mode",
+                        type=str,
+                        choices=IMAGE_MODES,
+                        default="copy",
+                        help="How the images are placed in the target directory.")
+    
+    parser.add_argument("--structured-errors",
+                        action="store_true",
+                        help="Also write the errors as JSON lines (file, shape index, error code) to label_errors.jsonl.")
+    
+    parser.add_argument("--kernel",
+                        type=str,
+                        choices=KERNELS,
+                        default="python",
+                        help="The shape normalization kernel, numpy normalizes all the shapes of a file at once.")
+    
+    parser.add_argument("--json-parser",
+                        type=str,
+                        choices=JSON_PARSERS,
+                        default="stream",
+                        help="The JSON parser, stream skips the embedded imageData without decoding it.")
+    
+    parser.add_argument("--image-ext",
+                        type=str,
+                        nargs="+",
+                        default=[".tiff"],
+                        help="The extensions of the image files paired with the JSON files (e.g. .tiff .tif .png .jpg).")
+    
+    parser.add_argument("--scan-workers",
+                        type=int,
+                        default=1,
+                        help="The number of threads scanning the directories below the source directory.")
+    
+    parser.add_argument("--pipeline",
+                        action="store_true",
+                        help="Overlap the JSON reads, the conversion and the writes with bounded queues.")
+    
+    parser.add_argument("--io-threads",
+                        type=int,
+                        default=4,
+                        help="The number of threads of each of the read and write stages of the pipeline.")
+    
+    parser.add_argument("--read-queue",
+                        type=int,
+                        default=16,
+                        help="The number of JSON files read ahead of the conversion in the pipeline.")
+    
+    parser.add_argument("--write-queue",
+                        type=int,
+                        default=16,
+                        help="The number of converted files waiting to be written in the pipeline.")
+    
+    parser.add_argument("--timings",
+                        action="store_true",
+                        help="Record the duration of each conversion phase and of each file, and report the slowest files.")
+    
+    parser.add_argument("--timings-json",
+                        type=str,
+                        help="Dump the timings (and the profile summary) to this JSON file, enables --timings.")
+    
+    parser.add_argument("--profile",
+                        type=str,
+                        help="Profile the conversion with cProfile and save the statistics to this file.")
+    
+    parser.add_argument("--label-map",
+                        type=str,
+                        help="A JSON or YAML file with the class names and label aliases (default: label1 to label4).")
+    
+    parser.add_argument("--scan-labels",
+                        action="store_true",
+                        help="Collect the labels of all the files first: reports the unknown labels, or builds classes.txt without --label-map.")
+    
+    parser.add_argument("--simplify",
+                        type=float,
+                        default=0.0,
+                        help="Simplify the segmentation polygons with this Douglas-Peucker tolerance in pixels (default: 0, keep every vertex).")
+    
+    parser.add_argument("--max-vertices",
+                        type=int,
+                        default=0,
+                        help="The largest number of vertices of a segmentation polygon (default: 0, no limit).")
+    
+    parser.add_argument("--split",
+                        type=float,
+                        nargs="+",
+                        help="Write deduplicated, class-stratified train/val(/test) lists and a data.yaml with these ratios, e.g. 0.8 0.1 0.1.")
+    
+    parser.add_argument("--split-seed",
+                        type=int,
+                        default=0,
+                        help="The seed of the deterministic dataset split.")
+    
+    parser.add_argument("--output-layout",
+                        type=str,
+                        choices=OUTPUT_LAYOUTS,
+                        default="flat",
+                        help="The layout of the outputs: flat directories, subdirectories of --shard-size files or tar shards.")
+    
+    parser.add_argument("--shard-size",
+                        type=int,
+                        default=1000,
+                        help="The number of files per shard of the sharded and tar layouts.")
+    
+    parser.add_argument("--arrays",
+                        type=str,
+                        help="Save the labels of the (first) task as a compact, memory-mappable .npz shard instead of label files.")
+    
+    parser.add_argument("--log-level",
+                        type=str,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        default="INFO",
+                        help="The level of the console messages, DEBUG also reports every processed file.")
+    
+    parser.add_argument("--quiet",
+                        action="store_true",
+                        help="Only report the errors on the console, without progress line or summary.")
+    
+    parser.add_argument("--summary-interval",
+                        type=float,
+                        default=30.0,
+                        help="The number of seconds between two progress summaries, 0 to disable them.")
     
     args = parser.parse_args()
     
+    handler = _ConsoleHandler(sys.stdout)
+    logger.addHandler(handler)
+    logger.setLevel(logging.ERROR if args.quiet else args.log_level)
+    
+    if args.verify:
+        try:
+            stats = verify_labels(args.verify, workers=args.workers)
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during the verification: {str(e)}")
+            return 1
+        logger.info(f"Number of label files: {stats['files']} ({stats['invalid_files']} with invalid lines)")
+        logger.info(f"Number of labels: {stats['lines']} ({stats['bboxes']} bounding boxes, "
+                    f"{stats['polygons']} polygons, {stats['invalid_lines']} invalid)")
+        logger.info(f"Detailed error report: {stats['errors_path']}")
+        return 1 if stats["invalid_lines"] else 0
+    
+    if not (args.path and args.target and args.task):
+        parser.error("--path, --target and --task are required")
+    
     try:
-        json_to_yolo = JsonToYolo(args.path, args.target, args.task)
-        json_to_yolo.process()
+        json_to_yolo = JsonToYolo(args.path, args.target, args.task, workers=args.workers,
+                                  incremental=args.incremental, image_mode=args.image_mode,
+                                  structured_errors=args.structured_errors, kernel=args.kernel,
+                                  json_parser=args.json_parser, image_extensions=tuple(args.image_ext),
+                                  scan_workers=args.scan_workers, pipeline=args.pipeline,
+                                  io_threads=args.io_threads, read_queue_depth=args.read_queue,
+                                  write_queue_depth=args.write_queue, timings=args.timings,
+                                  timings_path=args.timings_json, profile_path=args.profile,
+                                  progress=not args.quiet, summary_interval=args.summary_interval,
+                                  output_layout=args.output_layout, shard_size=args.shard_size,
+                                  label_map=args.label_map, scan_labels=args.scan_labels,
+                                  simplify_tolerance=args.simplify, max_vertices=args.max_vertices,
+                                  split=tuple(args.split) if args.split else None, split_seed=args.split_seed)
+        if args.arrays:
+            arrays = json_to_yolo.to_arrays()
+            arrays.save(args.arrays)
+            logger.info(f"Saved {len(arrays)} files and {len(arrays.class_ids)} labels: {args.arrays}")
+        else:
+            json_to_yolo.process()
     except Exception as e:
-        print(f"Error: An unexpected error occurred during the process: {str(e)}")
+        logger.error(f"An unexpected error occurred during the process: {str(e)}")
         return 1
     
     return 0